@@ -7,3 +7,9 @@ import pytest
 def test_resources(request):
     # Get path to "test_relocs" resource dir
     return pathlib.Path(request.module.__file__).parent / 'resources'
+
+
+@pytest.fixture(autouse=True)
+def isolate_cache(tmp_path, monkeypatch):
+    # Keep the packer's build cache out of the user's home directory
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path / 'xdg-cache'))
@@ -0,0 +1,89 @@
+import pytest
+
+
+@pytest.fixture
+def archive_file(tmp_path):
+    from ttblit.asset.writer import AssetWriter
+
+    writer = AssetWriter()
+    writer.add_asset('asset_font', b'FONT\x01\x02\x03')
+    writer.add_asset('asset_text', b'hello')
+    writer.add_asset('asset_empty', b'')
+    writer.write(None, tmp_path / 'assets.arc', report=False)
+
+    return tmp_path / 'assets.arc'
+
+
+def test_archive_layout(archive_file):
+    from ttblit.core.archive import Archive
+
+    data = archive_file.read_bytes()
+    magic, header_length, align, count = Archive.header.unpack_from(data)
+
+    assert magic == b'ARCV'
+    assert header_length == 12
+    assert align == 4
+    assert count == 3
+
+    entries = [Archive.entry.unpack_from(data, header_length + i * Archive.entry.size) for i in range(count)]
+    assert [e[0] for e in entries] == sorted(e[0] for e in entries)
+    for hash, offset, length, type, flags in entries:
+        assert offset % 4 == 0
+        assert offset >= header_length + count * Archive.entry.size
+
+
+def test_archive_reader(archive_file):
+    from ttblit.core.archive import Archive
+
+    with Archive(archive_file) as archive:
+        assert len(archive) == 3
+        assert 'asset_text' in archive
+        assert 'asset_missing' not in archive
+
+        with archive['asset_font'] as view:
+            assert view == b'FONT\x01\x02\x03'
+        with archive['asset_text'] as view:
+            assert view == b'hello'
+        with archive['asset_empty'] as view:
+            assert view == b''
+
+        assert archive.find('asset_font').type == b'FONT'
+        assert archive.find('asset_text').type == bytes(4)
+
+        with pytest.raises(KeyError):
+            archive['asset_missing']
+
+
+def test_archive_string_data(tmp_path):
+    from ttblit.asset.writer import AssetWriter
+    from ttblit.core.archive import Archive
+
+    writer = AssetWriter()
+    writer.add_asset('asset_text', 'asset_font')
+    writer.add_asset('asset_font', b'FONT')
+    writer.write(None, tmp_path / 'assets.arc', report=False)
+
+    # String data is the asset's content, not the name of a symbol to alias
+    with Archive(tmp_path / 'assets.arc') as archive:
+        with archive['asset_text'] as view:
+            assert view == b'asset_font'
+        with archive['asset_font'] as view:
+            assert view == b'FONT'
+
+
+def test_archive_symbol_hash():
+    from ttblit.core.archive import Archive
+
+    # Reference values for 32bit FNV-1a
+    assert Archive.symbol_hash('') == 0x811c9dc5
+    assert Archive.symbol_hash('a') == 0xe40c292c
+    assert Archive.symbol_hash('foobar') == 0xbf9cf968
+
+
+def test_archive_not_archive(tmp_path):
+    from ttblit.core.archive import Archive
+
+    (tmp_path / 'bad.arc').write_bytes(bytes(16))
+
+    with pytest.raises(ValueError):
+        Archive(tmp_path / 'bad.arc')
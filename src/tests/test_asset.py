@@ -14,3 +14,303 @@ def test_formatter_components():
         listified = {k: [v] for k, v in fragments.items()}
         result = formatter.join(path, listified)
         assert tuple(result.keys()) == formatter.components
+        if formatter.alias:
+            assert tuple(formatter.alias('alias', 'hello').keys()) == formatter.components
+
+
+def test_builder_passes_input_through(test_resources):
+    from ttblit.asset.builders import raw
+    from ttblit.asset.data import FileData
+
+    output = raw.raw.from_file(test_resources / 'doom-fire.bin', None)
+
+    # The input is only read when it's written
+    assert type(output) is FileData
+    assert len(output) == (test_resources / 'doom-fire.bin').stat().st_size
+    assert bytes(output) == (test_resources / 'doom-fire.bin').read_bytes()
+    assert output[:4] == (test_resources / 'doom-fire.bin').read_bytes()[:4]
+
+
+def test_builder_empty_input(tmp_path):
+    from ttblit.asset.builders import raw
+
+    (tmp_path / 'empty.bin').write_bytes(b'')
+
+    assert bytes(raw.raw.from_file(tmp_path / 'empty.bin', None)) == b''
+
+
+def test_builder_reads_input(test_resources):
+    from ttblit.asset.builders import image
+
+    # Builders which don't pass their input through are given its contents
+    assert image.image.passthrough is False
+    assert image.image.from_file(test_resources / 'image.png', None)[:4] == b'SPRI'
+
+
+def test_writer_raw_binary_stream(test_resources, tmp_path):
+    from ttblit.asset.builders import raw
+    from ttblit.asset.writer import AssetWriter
+
+    aw = AssetWriter()
+    aw.add_asset('fire', raw.raw.from_file(test_resources / 'doom-fire.bin', None))
+    aw.add_asset('csv', raw.raw.build(b'1, 2, 3', 'csv'))
+    aw.write(path=tmp_path / 'assets.bin')
+
+    assert (tmp_path / 'assets.bin').read_bytes() == (test_resources / 'doom-fire.bin').read_bytes() + b'\x01\x02\x03'
+
+
+def test_c_initializer_wrapping():
+    """The C emitter should wrap values exactly as textwrap would."""
+    import textwrap
+
+    from ttblit.asset.formatters.c import c_initializer
+
+    wrapper = textwrap.TextWrapper(initial_indent='    ', subsequent_indent='    ', width=80)
+
+    for size in (1, 11, 12, 13, 24, 25, 100, 12 * 1024, 12 * 1024 + 1, 12 * 1024 + 13):
+        data = bytes(i & 0xff for i in range(size))
+        expected = ' = {\n' + wrapper.fill(', '.join(f'0x{c:02x}' for c in data)) + '\n}'
+        assert ''.join(c_initializer(data)) == expected
+
+
+def test_c_initializer_streams():
+    """The C emitter's memory use shouldn't grow with the size of the asset."""
+    import tracemalloc
+
+    from ttblit.asset.formatters.c import c_initializer
+
+    data = bytes(2 * 1024 * 1024)
+    tracemalloc.start()
+    try:
+        for chunk in c_initializer(data):
+            pass
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    # A chunk of output is about 80KB
+    assert peak < 1024 * 1024
+
+
+def test_writer_c_source_stream(tmp_path):
+    from ttblit.asset.writer import AssetWriter
+
+    writer = AssetWriter()
+    writer.add_asset('asset_data', bytes(range(13)))
+    writer.write('c_source', tmp_path / 'out.cpp')
+
+    assert (tmp_path / 'out.cpp').read_text() == (
+        '// Auto Generated File - DO NOT EDIT!\n'
+        '#include <out.hpp>\n'
+        '\n'
+        'const uint8_t asset_data[] = {\n'
+        '    0x00, 0x01, 0x02, 0x03, 0x04, 0x05, 0x06, 0x07, 0x08, 0x09, 0x0a, 0x0b, 0x0c\n'
+        '};\n'
+        'const uint32_t asset_data_length = sizeof(asset_data);\n'
+    )
+    assert (tmp_path / 'out.hpp').read_text() == (
+        '// Auto Generated File - DO NOT EDIT!\n'
+        '#pragma once\n'
+        '#include <cstdint>\n'
+        '\n'
+        'extern const uint8_t asset_data[];\n'
+        'extern const uint32_t asset_data_length;\n'
+    )
+
+
+def test_writer_asm_incbin(tmp_path):
+    from ttblit.asset.writer import AssetWriter
+
+    writer = AssetWriter()
+    writer.add_asset('asset_a', b'hello')
+    writer.add_asset('asset_b', bytes(range(7)))
+    writer.write(None, tmp_path / 'out.S')
+
+    binary = (tmp_path / 'out.bin').resolve().as_posix()
+    source = (tmp_path / 'out.S').read_text()
+
+    assert (tmp_path / 'out.bin').read_bytes() == b'hello' + bytes(range(7))
+    assert f'asset_a:\n    .incbin "{binary}", 0, 5\n' in source
+    assert f'asset_b:\n    .incbin "{binary}", 5, 7\n' in source
+    assert 'asset_b_length:\n    .4byte 7\n' in source
+    assert 'extern const uint8_t asset_b[];\n' in (tmp_path / 'out.hpp').read_text()
+
+
+def test_writer_skips_unchanged(tmp_path):
+    import os
+
+    from ttblit.asset.writer import AssetWriter
+
+    def write(data):
+        writer = AssetWriter()
+        writer.add_asset('asset_data', data)
+        writer.write('c_source', tmp_path / 'out.cpp', force=True)
+
+    write(b'hello')
+    outputs = [tmp_path / 'out.cpp', tmp_path / 'out.hpp', tmp_path / 'out_report.txt']
+    for output in outputs:
+        os.utime(output, (0, 0))
+
+    write(b'hello')
+    assert [output.stat().st_mtime for output in outputs] == [0, 0, 0]
+
+    write(b'world')
+    assert (tmp_path / 'out.cpp').stat().st_mtime != 0
+    assert '0x77, 0x6f, 0x72, 0x6c, 0x64' in (tmp_path / 'out.cpp').read_text()
+    # The declarations did not change
+    assert (tmp_path / 'out.hpp').stat().st_mtime == 0
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['out.cpp', 'out.hpp', 'out_report.txt']
+
+
+def test_writer_replaces_longer_file(tmp_path):
+    from ttblit.asset.writer import AssetWriter
+
+    (tmp_path / 'out.bin').write_bytes(b'hello world')
+
+    writer = AssetWriter()
+    writer.add_asset('asset_data', b'hello')
+    writer.write('raw_binary', tmp_path / 'out.bin', force=True, report=False)
+
+    assert (tmp_path / 'out.bin').read_bytes() == b'hello'
+
+
+def test_writer_deduplicates(tmp_path):
+    from ttblit.asset.writer import AssetWriter
+
+    writer = AssetWriter()
+    writer.add_asset('asset_a', b'hello')
+    writer.add_asset('asset_b', b'world')
+    writer.add_asset('asset_c', b'hello')
+    writer.write('c_source', tmp_path / 'out.cpp')
+
+    source = (tmp_path / 'out.cpp').read_text()
+    header = (tmp_path / 'out.hpp').read_text()
+    report = (tmp_path / 'out_report.txt').read_text()
+
+    assert source.count('0x68, 0x65, 0x6c, 0x6c, 0x6f') == 1
+    assert 'asset_c' not in source
+    assert '#define asset_c asset_a\n#define asset_c_length asset_a_length\n' in header
+    assert 'asset_c: asset_a' in report
+    assert 'Bytes saved: 5' in report
+
+
+def test_writer_deduplicates_archive(tmp_path):
+    from ttblit.asset.writer import AssetWriter
+    from ttblit.core.archive import Archive
+
+    writer = AssetWriter()
+    writer.add_asset('asset_a', b'hello')
+    writer.add_asset('asset_b', b'hello')
+    writer.write(None, tmp_path / 'out.arc', report=False)
+
+    with Archive(tmp_path / 'out.arc') as archive:
+        assert len(archive) == 2
+        assert archive.find('asset_a').offset == archive.find('asset_b').offset
+        with archive['asset_b'] as view:
+            assert view == b'hello'
+
+    assert (tmp_path / 'out.arc').stat().st_size == 12 + 2 * 20 + 5
+
+
+def test_writer_split_source(tmp_path):
+    from ttblit.asset.writer import AssetWriter
+
+    writer = AssetWriter()
+    writer.add_asset('asset_a', bytes([1]) * 100)
+    writer.add_asset('asset_b', bytes([2]) * 100)
+    writer.add_asset('asset_c', bytes([3]) * 10)
+    writer.add_asset('asset_d', bytes([4]) * 190)
+    writer.write('c_source', tmp_path / 'out.cpp', split=3)
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        'out.hpp', 'out_0.cpp', 'out_1.cpp', 'out_2.cpp', 'out_report.txt'
+    ]
+
+    shards = [(tmp_path / f'out_{i}.cpp').read_text() for i in range(3)]
+    assert ['asset_a[]' in s for s in shards] == [True, False, False]
+    assert ['asset_b[]' in s for s in shards] == [False, True, False]
+    assert ['asset_c[]' in s for s in shards] == [False, True, False]
+    assert ['asset_d[]' in s for s in shards] == [False, False, True]
+    assert all('#include <out.hpp>' in s for s in shards)
+
+    header = (tmp_path / 'out.hpp').read_text()
+    assert all(f'extern const uint8_t asset_{x}[];' in header for x in 'abcd')
+
+
+def test_writer_split_unsupported(tmp_path):
+    import pytest
+
+    from ttblit.asset.writer import AssetWriter
+
+    writer = AssetWriter()
+    writer.add_asset('asset_a', bytes(100))
+
+    with pytest.raises(ValueError):
+        writer.write('c_header', tmp_path / 'out.hpp', split=2)
+
+
+def test_writer_raw_alignment(tmp_path):
+    from ttblit.asset.writer import AssetWriter
+
+    writer = AssetWriter()
+    writer.add_asset('asset_a', b'abc')
+    writer.add_asset('asset_b', b'def', align=8)
+    writer.add_asset('asset_c', b'ghi')
+    writer.write('raw_binary', tmp_path / 'out.bin', report=False)
+
+    assert (tmp_path / 'out.bin').read_bytes() == b'abc' + bytes(5) + b'defghi'
+
+
+def test_writer_archive_alignment(tmp_path):
+    from ttblit.asset.writer import AssetWriter
+    from ttblit.core.archive import Archive
+
+    writer = AssetWriter()
+    writer.add_asset('asset_a', b'abc')
+    writer.add_asset('asset_b', b'def', align=64)
+    writer.write('archive', tmp_path / 'out.arc', report=False)
+
+    with Archive(tmp_path / 'out.arc') as archive:
+        assert archive.find('asset_b').offset == 64
+        with archive['asset_b'] as view:
+            assert view == b'def'
+
+
+def test_writer_invalid_alignment():
+    import pytest
+
+    from ttblit.asset.writer import AssetWriter
+
+    writer = AssetWriter()
+
+    with pytest.raises(ValueError):
+        writer.add_asset('asset_a', b'abc', align=3)
+
+
+def test_asset_data_metadata(tmp_path):
+    import pickle
+
+    from ttblit.asset.builder import AssetData
+    from ttblit.asset.writer import AssetWriter
+
+    data = AssetData(b'hello', width=5, signed=-1, flipped=True, kind='text')
+    assert data == b'hello'
+    assert pickle.loads(pickle.dumps(data)).metadata == data.metadata
+
+    writer = AssetWriter()
+    writer.add_asset('asset_a', data)
+    writer.add_asset('asset_b', AssetData(b'hello', width=5, signed=-1, flipped=True, kind='text'))
+    writer.write('c_source', tmp_path / 'out.cpp', metadata=True)
+
+    header = (tmp_path / 'out.hpp').read_text()
+    assert (
+        'extern const uint32_t asset_a_length;\n'
+        'constexpr uint32_t asset_a_width = 5;\n'
+        'constexpr int32_t asset_a_signed = -1;\n'
+        'constexpr bool asset_a_flipped = true;\n'
+        'constexpr char asset_a_kind[] = "text";\n'
+    ) in header
+    assert '#define asset_b_width asset_a_width\n' in header
+
+    writer.write('c_source', tmp_path / 'out.cpp', force=True)
+    assert 'constexpr' not in (tmp_path / 'out.hpp').read_text()
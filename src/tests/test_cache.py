@@ -0,0 +1,162 @@
+import os
+
+import pytest
+
+
+@pytest.fixture
+def cache(tmp_path):
+    from ttblit.asset.cache import AssetCache
+
+    return AssetCache(tmp_path / 'cache', max_size=1024 * 1024)
+
+
+def test_asset_key(tmp_path):
+    from ttblit.asset.cache import asset_key
+
+    (tmp_path / 'input.bin').write_bytes(b'hello')
+    (tmp_path / 'palette.act').write_bytes(bytes(768))
+
+    key = asset_key('image', 'image', tmp_path / 'input.bin', {'palette': tmp_path / 'palette.act'})
+
+    assert key == asset_key('image', 'image', tmp_path / 'input.bin', {'palette': tmp_path / 'palette.act'})
+    assert key != asset_key('image', 'image', tmp_path / 'input.bin', {'palette': tmp_path / 'palette.act', 'strict': True})
+    assert key != asset_key('raw', 'binary', tmp_path / 'input.bin', {'palette': tmp_path / 'palette.act'})
+
+    # The key follows the contents of the input and of files named by options
+    (tmp_path / 'palette.act').write_bytes(bytes(767) + b'\x01')
+    assert key != asset_key('image', 'image', tmp_path / 'input.bin', {'palette': tmp_path / 'palette.act'})
+
+    (tmp_path / 'copy.bin').write_bytes(b'hello')
+    assert asset_key('raw', 'binary', tmp_path / 'input.bin', {}) == asset_key('raw', 'binary', tmp_path / 'copy.bin', {})
+    assert asset_key('raw', 'binary', tmp_path / 'input.bin', {}, True) != asset_key('raw', 'binary', tmp_path / 'copy.bin', {}, True)
+
+
+def test_asset_key_by_stat(tmp_path):
+    from ttblit.asset.cache import asset_key
+
+    (tmp_path / 'input.bin').write_bytes(b'hello')
+    (tmp_path / 'copy.bin').write_bytes(b'hello')
+
+    key = asset_key('raw', 'binary', tmp_path / 'input.bin', {}, by_content=False)
+
+    assert key == asset_key('raw', 'binary', tmp_path / 'input.bin', {}, by_content=False)
+    assert key != asset_key('raw', 'binary', tmp_path / 'copy.bin', {}, by_content=False)
+
+    # Writing the file changes its modification time, even if the size is the same
+    stat = (tmp_path / 'input.bin').stat()
+    os.utime(tmp_path / 'input.bin', ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    assert key != asset_key('raw', 'binary', tmp_path / 'input.bin', {}, by_content=False)
+
+
+def test_cache_get_put(cache, tmp_path):
+    from ttblit.asset.builder import AssetData
+
+    (tmp_path / 'tileset.png').write_bytes(b'tiles')
+
+    assert cache.get('key') is None
+
+    cache.put('key', {None: AssetData(b'map', width=1), 'tileset': b'tileset'}, [tmp_path / 'tileset.png'])
+    data, reads = cache.get('key')
+
+    assert data == {None: b'map', 'tileset': b'tileset'}
+    assert data[None].metadata == {'width': 1}
+    assert reads == [tmp_path / 'tileset.png']
+
+    # Entries are out of date when another file the builder read changes
+    (tmp_path / 'tileset.png').write_bytes(b'other tiles')
+    assert cache.get('key') is None
+
+
+def test_cache_evicts_least_recently_used(cache):
+    cache.max_size = 2500
+
+    for i, key in enumerate(('a', 'b', 'c')):
+        cache.put(key, bytes(1000))
+        os.utime(cache.path / f'{key}.pickle', (i, i))
+
+    # Using an entry makes it the most recent
+    assert cache.get('a') is not None
+    cache.evict()
+
+    assert cache.get('a') is not None
+    assert cache.get('b') is None
+    assert cache.get('c') is not None
+
+
+def test_packer_uses_cache(test_resources, tmp_path, monkeypatch):
+    from ttblit.asset.cache import AssetCache
+    from ttblit.tool import packer
+
+    cache = AssetCache(tmp_path / 'cache')
+    config = test_resources / 'assets_multi_out.yml'
+
+    packer.Packer().run(config, tmp_path / 'first', None, False, cache=cache)
+    assert len(list(cache.path.glob('*.pickle'))) == 2
+
+    def fail(*args):
+        raise AssertionError('Cached asset was rebuilt')
+
+    monkeypatch.setattr(packer, 'build_asset', fail)
+    packer.Packer().run(config, tmp_path / 'second', None, False, cache=cache)
+
+    assert (tmp_path / 'first' / 'assets.cpp').read_bytes() == (tmp_path / 'second' / 'assets.cpp').read_bytes()
+
+
+def test_packer_skips_caching_pass_through(tmp_path):
+    from ttblit.asset.cache import AssetCache
+    from ttblit.tool import packer
+
+    cache = AssetCache(tmp_path / 'cache')
+    (tmp_path / 'data.bin').write_bytes(bytes(1024))
+    (tmp_path / 'data.csv').write_text('1, 2, 3')
+    (tmp_path / 'assets.yml').write_text('''assets.hpp:
+  data.bin:
+  data.csv:
+''')
+    packer.Packer().run(tmp_path / 'assets.yml', tmp_path / 'out', None, False, cache=cache)
+
+    # Only the csv, which the builder converted, is cached
+    assert len(list(cache.path.glob('*.pickle'))) == 1
+
+
+def test_packer_without_cache_skips_hashing(tmp_path, monkeypatch):
+    from ttblit.asset import cache
+    from ttblit.tool import packer
+
+    def file_digest(path):
+        raise AssertionError(f'{path} was hashed')
+
+    monkeypatch.setattr(cache, 'file_digest', file_digest)
+    (tmp_path / 'data.bin').write_bytes(bytes(1024))
+    (tmp_path / 'data.csv').write_text('1, 2, 3')
+    (tmp_path / 'assets.yml').write_text('''assets.hpp:
+  data.bin:
+  data.csv:
+''')
+    packer.Packer().run(tmp_path / 'assets.yml', tmp_path / 'out', None, False)
+
+    assert 'data_csv' in (tmp_path / 'out' / 'assets.hpp').read_text()
+
+
+def test_packer_shares_builds(test_resources, tmp_path, monkeypatch):
+    from ttblit.tool import packer
+
+    calls = []
+    build_asset = packer.build_asset
+
+    def counting_build_asset(*args):
+        calls.append(args)
+        return build_asset(*args)
+
+    monkeypatch.setattr(packer, 'build_asset', counting_build_asset)
+    (tmp_path / 'image.png').write_bytes((test_resources / 'image.png').read_bytes())
+    (tmp_path / 'assets.yml').write_text('''one.hpp:
+  image.png: first
+two.hpp:
+  image.png: second
+''')
+    packer.Packer().run(tmp_path / 'assets.yml', tmp_path / 'out', None, False)
+
+    assert len(calls) == 1
+    assert 'first' in (tmp_path / 'out' / 'one.hpp').read_text()
+    assert 'second' in (tmp_path / 'out' / 'two.hpp').read_text()
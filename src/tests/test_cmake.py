@@ -117,3 +117,28 @@ def test_cmake_multiple_outputs(test_resources, test_cmake_file):
         ])
 
     assert open(test_cmake_file.name).read().startswith('# Auto Generated File - DO NOT EDIT!')
+
+
+def test_cmake_asset_split(tmp_path):
+    from ttblit import main
+
+    (tmp_path / 'assets.yml').write_text('''assets.cpp:
+  split: 2
+  assets/*.bin: asset_data
+''')
+
+    with pytest.raises(SystemExit):
+        main([
+            'cmake',
+            '--config', str(tmp_path / 'assets.yml'),
+            '--output', str(tmp_path / 'build'),
+            '--cmake', str(tmp_path / 'assets.cmake')
+        ])
+
+    cmake = (tmp_path / 'assets.cmake').read_text()
+    outputs = cmake[cmake.index('ASSET_OUTPUTS'):]
+
+    assert 'build/assets.hpp' in outputs
+    assert 'build/assets_0.cpp' in outputs
+    assert 'build/assets_1.cpp' in outputs
+    assert 'build/assets.cpp' not in outputs
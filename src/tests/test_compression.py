@@ -0,0 +1,70 @@
+import pytest
+
+
+@pytest.mark.parametrize('values', [
+    [],
+    [7],
+    [0] * 1000,
+    list(range(300)),
+    [1, 2, 2, 3, 3, 3, 4, 5, 6, 6] * 50,
+])
+@pytest.mark.parametrize('value_size', [1, 2])
+def test_tile_rl_round_trip(values, value_size):
+    from ttblit.core.compression import TileRL
+
+    values = [v & ((1 << (value_size * 8)) - 1) for v in values]
+    data = TileRL.compress(values, value_size)
+    decoded, offset = TileRL.decompress(data, value_size, len(values))
+
+    assert decoded.tolist() == values
+    assert offset == len(data)
+
+
+def test_tile_rl_runs():
+    from ttblit.core.compression import TileRL
+
+    # One literal run of two values, then a repeat of three
+    assert TileRL.compress([1, 2, 3, 3, 3], 1) == bytes([0x01, 1, 2, 0x82, 3])
+    assert TileRL.compress([0] * 130, 2) == bytes([0xff, 0, 0, 0x81, 0, 0])
+
+
+@pytest.mark.parametrize('data', [
+    b'',
+    b'a',
+    b'abcabcabcabcabcabc',
+    b'\0' * 5000,
+    bytes(range(256)) * 20,
+    b'The quick brown fox jumps over the lazy dog. ' * 100,
+])
+@pytest.mark.parametrize('window_bits', [8, 10, 12])
+def test_lz_round_trip(data, window_bits):
+    from ttblit.core.compression import LZ
+
+    compressed = LZ.compress(data, window_bits)
+    assert LZ.decompress(compressed) == data
+
+
+def test_lz_blocks():
+    import random
+
+    from ttblit.core.compression import LZ
+
+    rng = random.Random(0)
+    data = bytes(rng.choice(b'abcd') for _ in range(3000))
+    compressed = LZ.compress(data, block_size=1024)
+
+    assert compressed[:4] == b'LZSS'
+    assert len(compressed) < len(data)
+    assert LZ.decompress(compressed) == data
+    # The last block can be decoded on its own
+    assert LZ.decompress_block(compressed, 2) == data[2048:]
+
+
+def test_lz_invalid():
+    from ttblit.core.compression import LZ
+
+    with pytest.raises(ValueError):
+        LZ.compress(b'data', window_bits=13)
+
+    with pytest.raises(ValueError):
+        LZ.decompress_block(b'NOPE' + bytes(16), 0)
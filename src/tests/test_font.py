@@ -14,3 +14,37 @@ def test_font_image_rows(test_resources):
     expected = open(test_resources / "8x8font_rows.bin", "rb").read()
 
     assert output == expected
+
+
+def test_font_image_proportional(test_resources):
+    import struct
+
+    from ttblit.asset.builders import font
+    image = open(test_resources / "8x8font.png", "rb").read()
+    fixed = font.font.build(image, 'image')
+    output = font.font.build(image, 'image', proportional=True)
+
+    assert output[:4] == b'FNTP'
+    assert output[4:8] == fixed[4:8]
+    assert len(output) < len(fixed)
+
+    num_chars, char_width, char_height = output[4:7]
+    column_bytes = (char_height + 7) // 8
+    glyph_bytes = char_width * column_bytes
+
+    font_w = output[8:8 + num_chars]
+    x_offsets = output[8 + num_chars:8 + num_chars * 2]
+    table = 8 + num_chars * 2
+    offsets = struct.unpack(f'<{num_chars + 1}H', output[table:table + (num_chars + 1) * 2])
+    glyph_data = output[table + (num_chars + 1) * 2:]
+
+    assert font_w == fixed[8:8 + num_chars]
+    assert offsets[-1] == len(glyph_data)
+
+    # Expanding each trimmed glyph back to full width must give the fixed layout
+    fixed_data = fixed[8 + num_chars:]
+    for c in range(num_chars):
+        glyph = glyph_data[offsets[c]:offsets[c + 1]]
+        expanded = bytes(x_offsets[c] * column_bytes) + glyph
+        expanded += bytes(glyph_bytes - len(expanded))
+        assert expanded == fixed_data[c * glyph_bytes:(c + 1) * glyph_bytes]
@@ -140,3 +140,20 @@ def test_image_png_cli_packed_multi_transparent():
 
         with pytest.raises(SystemExit):
             main(['image', '--input_file', temp_png.name, '--packed', '--output_format', 'c_header'])
+
+
+def test_image_png_cli_metadata(test_input_file, tmp_path):
+    from ttblit import main
+
+    with pytest.raises(SystemExit):
+        main([
+            'image', '--input_file', test_input_file.name, '--packed', 'no', '--metadata',
+            '--output_file', str(tmp_path / 'image.hpp'), '--symbol_name', 'image'
+        ])
+
+    header = (tmp_path / 'image.hpp').read_text()
+
+    assert 'constexpr uint32_t image_width = 128;\n' in header
+    assert 'constexpr uint32_t image_height = 128;\n' in header
+    assert 'constexpr char image_format[] = "RW";\n' in header
+    assert 'constexpr uint32_t image_palette_size = 3;\n' in header
@@ -0,0 +1,65 @@
+import importlib
+import pkgutil
+import subprocess
+import sys
+
+import pytest
+
+# Dependencies only some commands need, which shouldn't slow down the rest
+slow_modules = ('PIL', 'construct', 'bitstring', 'serial', 'tqdm', 'elftools', 'numpy', 'freetype', 'yaml')
+
+
+def imported_modules(code):
+    """Run code in a fresh interpreter. Returns the modules it imported, and how long importing ttblit took in us."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code + '\nimport sys\nprint(" ".join(sys.modules))'],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True, check=True
+    )
+    import_time = None
+    for line in result.stderr.splitlines():
+        # Lines are "import time: self | cumulative | name", nested imports are indented
+        if line.startswith('import time:') and line.endswith('| ttblit'):
+            import_time = int(line.split('|')[1])
+    return result.stdout.splitlines()[-1].split(), import_time
+
+
+@pytest.mark.parametrize('code', (
+    'import ttblit',
+    'import ttblit.asset.builder',
+    'import ttblit\ntry:\n    ttblit.main(["version"])\nexcept SystemExit:\n    pass',
+))
+def test_import_is_lazy(code):
+    modules, import_time = imported_modules(code)
+    slow = sorted(name for name in modules if name.split('.')[0] in slow_modules)
+    assert slow == [], f'Importing ttblit took {import_time}us, including {", ".join(slow)}'
+
+
+def test_command_imports_its_module():
+    modules, import_time = imported_modules('import ttblit\ntry:\n    ttblit.main(["pack", "--help"])\nexcept SystemExit:\n    pass')
+    assert 'ttblit.tool.packer' in modules
+    assert 'ttblit.tool.flasher' not in modules
+
+
+@pytest.mark.parametrize('registry', ('builders', 'formatters'))
+def test_registry_lists_every_implementation(registry):
+    from ttblit.asset.builder import AssetBuilder
+    from ttblit.asset.formatter import AssetFormatter
+
+    package = importlib.import_module(f'ttblit.asset.{registry}')
+    cls = AssetBuilder if registry == 'builders' else AssetFormatter
+
+    # Import every module, so anything missing from the registry is registered anyway
+    for loader, module_name, is_pkg in pkgutil.walk_packages(package.__path__, package.__name__ + '.'):
+        importlib.import_module(module_name)
+
+    assert set(dict.keys(cls._by_name)) == set(package.by_name)
+    assert set(dict.keys(cls._by_extension)) == set(package.by_extension)
+
+    for name, implementation in cls._by_name.items():
+        function = implementation.build if registry == 'builders' else implementation.fragments
+        assert function.__module__ == f'{package.__name__}.{package.by_name[name]}'
+
+    for extension, implementation in cls._by_extension.items():
+        # Builders register extensions as "builder/subtype"
+        name = implementation.split('/')[0] if registry == 'builders' else implementation.name
+        assert package.by_extension[extension] == package.by_name[name]
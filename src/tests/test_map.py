@@ -1,5 +1,7 @@
 import struct
 
+import pytest
+
 
 def test_map_tiled():
     from ttblit.asset.builders import map
@@ -33,6 +35,44 @@ def test_map_tiled_struct_8bit():
     assert output == struct.pack('<4sHHHHHH4B', b'MTMX', 16, 0, 0, 4, 1, 1, 0, 1, 2, 3)
 
 
+def test_map_tiled_metadata():
+    from ttblit.asset.builders import map
+
+    output = map.map.build(tiled_base64_map([1, 2, 3, 4]), 'tiled', output_struct=True)
+
+    assert output.metadata == {
+        'width': 4, 'height': 1, 'layers': 1, 'tile_width': 8, 'tile_height': 8,
+        'tile_bits': 8, 'transforms': False, 'flags': 0,
+    }
+
+
+def test_map_tiled_metadata_not_aliased(tmp_path):
+    from ttblit.asset.builders import map
+    from ttblit.asset.writer import AssetWriter
+
+    def tiled_map(width, height):
+        return map.map.build(f'''<?xml version="1.0" encoding="UTF-8"?>
+<map version="1.4" tiledversion="1.4.3" orientation="orthogonal" renderorder="right-down" width="{width}" height="{height}" tilewidth="8" tileheight="8" infinite="0" nextlayerid="2" nextobjectid="1">
+ <layer id="1" name="Tile Layer 1" width="{width}" height="{height}">
+  <data encoding="csv">
+1,2,3,4
+</data>
+ </layer>
+</map>
+''', 'tiled')
+
+    # The same tiles, but different dimensions
+    writer = AssetWriter()
+    writer.add_asset('map_a', tiled_map(4, 1))
+    writer.add_asset('map_b', tiled_map(2, 2))
+    writer.write('c_header', tmp_path / 'out.hpp', report=False, metadata=True)
+
+    header = (tmp_path / 'out.hpp').read_text()
+    assert '#define map_b' not in header
+    assert 'constexpr uint32_t map_a_width = 4;' in header
+    assert 'constexpr uint32_t map_b_width = 2;' in header
+
+
 def test_map_tiled_struct_16bit():
     from ttblit.asset.builders import map
 
@@ -84,3 +124,500 @@ def test_map_empty_tiled_remap_empty():
 ''', 'tiled', empty_tile=255)
 
     assert output == b'\x00\xFF\x00\x00'
+
+
+def tiled_base64_map(tiles, compression=None):
+    import base64
+    import gzip
+    import zlib
+
+    data = struct.pack(f'<{len(tiles)}I', *tiles)
+    if compression == 'zlib':
+        data = zlib.compress(data)
+    elif compression == 'gzip':
+        data = gzip.compress(data)
+    elif compression == 'zstd':
+        import zstandard
+        data = zstandard.ZstdCompressor().compress(data)
+
+    compression_attr = f' compression="{compression}"' if compression else ''
+
+    return f'''<?xml version="1.0" encoding="UTF-8"?>
+<map version="1.2" tiledversion="1.3.2" orientation="orthogonal" renderorder="right-down" compressionlevel="-1" width="{len(tiles)}" height="1" tilewidth="8" tileheight="8" infinite="0" nextlayerid="2" nextobjectid="1">
+ <layer id="1" name="Tile Layer 1" width="{len(tiles)}" height="1">
+  <data encoding="base64"{compression_attr}>
+   {base64.b64encode(data).decode('ascii')}
+  </data>
+ </layer>
+</map>
+'''
+
+
+@pytest.mark.parametrize('compression', [None, 'zlib', 'gzip', 'zstd'])
+def test_map_tiled_base64(compression):
+    from ttblit.asset.builders import map
+
+    if compression == 'zstd':
+        pytest.importorskip('zstandard')
+
+    output = map.map.build(tiled_base64_map([1, 2, 0, 4], compression), 'tiled', output_struct=True)
+    assert output == struct.pack('<4sHHHHHH4B', b'MTMX', 16, 0, 0, 4, 1, 1, 0, 1, 0, 3)
+
+
+def test_map_tiled_xml_tiles():
+    from ttblit.asset.builders import map
+
+    output = map.map.build('''<?xml version="1.0" encoding="UTF-8"?>
+<map version="1.2" tiledversion="1.3.2" orientation="orthogonal" renderorder="right-down" compressionlevel="-1" width="3" height="1" tilewidth="8" tileheight="8" infinite="0" nextlayerid="2" nextobjectid="1">
+ <layer id="1" name="Tile Layer 1" width="3" height="1">
+  <data>
+   <tile gid="3"/>
+   <tile/>
+   <tile gid="1"/>
+  </data>
+ </layer>
+</map>
+''', 'tiled', empty_tile=255)
+
+    assert output == b'\x02\xFF\x00\x00\x00\x00'
+
+
+def test_map_tiled_invalid_encoding():
+    from ttblit.asset.builders import map
+
+    with pytest.raises(ValueError):
+        map.map.build(tiled_base64_map([1]).replace('base64', 'base32'), 'tiled')
+
+
+def test_map_tiled_struct_transforms():
+    from ttblit.asset.builders import map
+
+    flipped_x = 0x80000000
+    flipped_y = 0x40000000
+
+    output = map.map.build(tiled_base64_map([1, 2 | flipped_x, 0, 4 | flipped_y]), 'tiled', output_struct=True)
+    assert output == struct.pack('<4sHHHHHH4B4B', b'MTMX', 16, 2, 0, 4, 1, 1, 0, 1, 0, 3, 0, 4, 0, 2)
+
+
+tiled_infinite_map = '''<?xml version="1.0" encoding="UTF-8"?>
+<map version="1.4" tiledversion="1.4.3" orientation="orthogonal" renderorder="right-down" width="2" height="2" tilewidth="8" tileheight="8" infinite="1" nextlayerid="3" nextobjectid="1">
+ <layer id="1" name="Tile Layer 1" width="2" height="2">
+  <data encoding="csv">
+   <chunk x="-2" y="0" width="2" height="2">
+1,2,
+3,4
+</chunk>
+   <chunk x="2" y="0" width="2" height="2">
+5,0,
+0,0
+</chunk>
+  </data>
+ </layer>
+</map>
+'''
+
+
+def test_map_tiled_infinite():
+    from ttblit.asset.builders import map
+
+    output = map.map.build(tiled_infinite_map, 'tiled', output_struct=True, empty_tile=255)
+    assert output == struct.pack(
+        '<4sHHHHHH12B', b'MTMX', 16, 0, 255, 6, 2, 1,
+        0, 1, 255, 255, 4, 255,
+        2, 3, 255, 255, 255, 255
+    )
+
+
+def test_map_tiled_chunked():
+    from ttblit.asset.builders import map
+
+    output = map.map.build(tiled_infinite_map, 'tiled', output_struct=True, empty_tile=255, chunk_size=2)
+    # 6x2 map split into three 2x2 chunks, the middle chunk is empty.
+    # The map's origin is at tile (-2, 0)
+    assert output == struct.pack(
+        '<4sHHHHHHHHii3I8B', b'MTMX', 28, 4, 255, 6, 2, 1, 2, 2, -2, 0,
+        0, 0xffffffff, 4,
+        0, 1, 2, 3,
+        4, 255, 255, 255
+    )
+
+
+def test_map_tiled_chunked_requires_struct():
+    from ttblit.asset.builders import map
+
+    with pytest.raises(ValueError):
+        map.map.build(tiled_infinite_map, 'tiled', chunk_size=2)
+
+
+def test_map_tiled_compressed():
+    from ttblit.asset.builders import map
+    from ttblit.core.compression import TileRL
+
+    tiles = [0] * 30 + [1, 2 | 0x80000000, 3] + [0] * 31
+    source = tiled_base64_map(tiles).replace('width="64" height="1"', 'width="16" height="4"')
+
+    plain = map.map.build(source, 'tiled', output_struct=True, empty_tile=255)
+    output = map.map.build(source, 'tiled', output_struct=True, empty_tile=255, compress='rle')
+
+    header = struct.unpack('<4sHHHHHH', output[:16])
+    assert header == (b'MTMX', 16, 0b1010, 255, 16, 4, 1)
+    assert len(output) < len(plain)
+
+    index = struct.unpack('<4I', output[16:32])
+    rows = output[32:]
+    tile_data = b''
+    transform_data = b''
+    for offset in index:
+        row, offset = TileRL.decompress(rows, 1, 16, offset)
+        transforms, offset = TileRL.decompress(rows, 1, 16, offset)
+        tile_data += row.tobytes()
+        transform_data += transforms.tobytes()
+
+    assert tile_data + transform_data == plain[16:]
+
+
+def test_map_tiled_compressed_chunked():
+    from ttblit.asset.builders import map
+    from ttblit.core.compression import TileRL
+
+    output = map.map.build(tiled_infinite_map, 'tiled', output_struct=True, empty_tile=255, chunk_size=2, compress='rle')
+    header = struct.unpack('<4sHHHHHHHHii', output[:28])
+    assert header == (b'MTMX', 28, 0b1100, 255, 6, 2, 1, 2, 2, -2, 0)
+
+    directory = struct.unpack('<3I', output[28:40])
+    assert directory[1] == 0xffffffff
+    chunk, _ = TileRL.decompress(output[40:], 1, 4, directory[2])
+    assert chunk.tolist() == [4, 255, 255, 255]
+
+
+def test_map_tiled_invalid_compression():
+    from ttblit.asset.builders import map
+
+    with pytest.raises(ValueError):
+        map.map.build(tiled_infinite_map, 'tiled', output_struct=True, compress='lz4')
+
+    with pytest.raises(ValueError):
+        map.map.build(tiled_infinite_map, 'tiled', compress='rle')
+
+
+def test_map_tiled_layer_flags():
+    from ttblit.asset.builders import map
+
+    output = map.map.build('''<?xml version="1.0" encoding="UTF-8"?>
+<map version="1.2" tiledversion="1.3.2" orientation="orthogonal" renderorder="right-down" compressionlevel="-1" width="4" height="1" tilewidth="8" tileheight="8" infinite="0" nextlayerid="4" nextobjectid="1">
+ <layer id="1" name="Tile Layer 1" width="4" height="1">
+  <data encoding="csv">
+1,2,3,4
+</data>
+ </layer>
+ <layer id="2" name="Tile Layer 2" width="4" height="1">
+  <data encoding="csv">
+300,0,0,0
+</data>
+ </layer>
+ <layer id="3" name="Tile Layer 3" width="4" height="1">
+  <data encoding="csv">
+1,2147483650,1073741827,3221225476
+</data>
+ </layer>
+</map>
+''', 'tiled', output_struct=True, layer_flags=True)
+
+    assert output == struct.pack(
+        '<4sHHHHHH4B4B4H4B2B',
+        b'MTMX', 20, 0b10011, 0, 4, 1, 3,
+        # Layer flags, padded to 4 bytes
+        0b00, 0b01, 0b10, 0,
+        # 8bit layer without transforms
+        0, 1, 2, 3,
+        # 16bit layer without transforms
+        299, 0, 0, 0,
+        # 8bit layer with 3bit transforms: 0, 4, 2, 6
+        0, 1, 2, 3, 0b10100000, 0b00001100
+    )
+
+
+def test_map_tiled_pack_transforms():
+    import numpy as np
+    from ttblit.asset.builders import map
+
+    transforms = np.array([0, 4, 2, 6, 7, 1, 3, 5], dtype=np.uint8)
+    packed = int.from_bytes(map.pack_transforms(transforms), 'little')
+
+    assert [(packed >> (i * 3)) & 7 for i in range(8)] == transforms.tolist()
+
+
+@pytest.fixture
+def tiled_map_with_tileset(tmp_path):
+    from PIL import Image
+
+    # 2x2 tiles of 8x8 pixels, each a different colour
+    colours = [(255, 0, 0), (0, 255, 0), (0, 0, 255), (255, 255, 255)]
+    tiles = Image.new('RGB', (16, 16))
+    for i, colour in enumerate(colours):
+        tiles.paste(colour, ((i % 2) * 8, (i // 2) * 8, (i % 2) * 8 + 8, (i // 2) * 8 + 8))
+    (tmp_path / 'images').mkdir()
+    tiles.save(tmp_path / 'images' / 'tiles.png')
+
+    (tmp_path / 'tiles.tsx').write_text('''<?xml version="1.0" encoding="UTF-8"?>
+<tileset version="1.4" tiledversion="1.4.3" name="tiles" tilewidth="8" tileheight="8" tilecount="4" columns="2">
+ <image source="images/tiles.png" width="16" height="16"/>
+ <tile id="1">
+  <properties>
+   <property name="solid" type="bool" value="true"/>
+  </properties>
+ </tile>
+ <tile id="3">
+  <properties>
+   <property name="material" type="int" value="5"/>
+   <property name="solid" type="bool" value="true"/>
+   <property name="sound" value="clang"/>
+  </properties>
+ </tile>
+</tileset>
+''')
+
+    tmx = tmp_path / 'level.tmx'
+    tmx.write_text('''<?xml version="1.0" encoding="UTF-8"?>
+<map version="1.4" tiledversion="1.4.3" orientation="orthogonal" renderorder="right-down" width="4" height="1" tilewidth="8" tileheight="8" infinite="0" nextlayerid="2" nextobjectid="1">
+ <tileset firstgid="1" source="tiles.tsx"/>
+ <layer id="1" name="Tile Layer 1" width="4" height="1">
+  <data encoding="csv">
+4,0,1,2147483652
+</data>
+ </layer>
+</map>
+''')
+    return tmx
+
+
+def test_map_tiled_extract_tileset(tiled_map_with_tileset):
+    from ttblit.asset.builders import map
+    from ttblit.core.struct import struct_blit_image
+
+    output = map.map.from_file(tiled_map_with_tileset, None, output_struct=True, tileset=True, packed=False)
+
+    assert output[None] == struct.pack('<4sHHHHHH8B', b'MTMX', 16, 2, 0, 4, 1, 1, 1, 0, 0, 1, 0, 0, 0, 4)
+
+    tileset = struct_blit_image.parse(output['tileset'])
+    assert (tileset.data.width, tileset.data.height) == (16, 8)
+
+    palette = [(c.r, c.g, c.b) for c in tileset.data.palette]
+    pixels = tileset.data.pixels
+    assert palette[pixels[0]] == (255, 0, 0)
+    assert palette[pixels[8]] == (255, 255, 255)
+
+
+def test_map_tiled_extract_tileset_cli(tiled_map_with_tileset):
+    from ttblit import main
+
+    output = tiled_map_with_tileset.with_suffix('.hpp')
+
+    with pytest.raises(SystemExit):
+        main([
+            'map', '--input_file', str(tiled_map_with_tileset), '--output_file', str(output),
+            '--symbol_name', 'level', '--tileset', 'true'
+        ])
+
+    hpp = output.read_text()
+    assert 'level[]' in hpp
+    assert 'level_tileset[]' in hpp
+
+
+def test_map_tiled_extract_tileset_missing():
+    from ttblit.asset.builders import map
+
+    with pytest.raises(ValueError):
+        map.map.build(tiled_infinite_map, 'tiled', tileset=True)
+
+
+def test_map_tiled_objects():
+    from ttblit.asset.builders import map
+
+    output = map.map.build('''<?xml version="1.0" encoding="UTF-8"?>
+<map version="1.4" tiledversion="1.4.3" orientation="orthogonal" renderorder="right-down" width="4" height="2" tilewidth="16" tileheight="16" infinite="0" nextlayerid="3" nextobjectid="4">
+ <tileset firstgid="1" name="tiles" tilewidth="16" tileheight="16" tilecount="1" columns="1">
+  <tile id="0">
+   <objectgroup draworder="index" id="2">
+    <object id="1" x="0" y="0" width="16" height="16"/>
+   </objectgroup>
+  </tile>
+ </tileset>
+ <layer id="1" name="Tile Layer 1" width="4" height="2">
+  <data encoding="csv">
+1,1,1,1,
+0,0,0,0
+</data>
+ </layer>
+ <objectgroup id="2" name="Objects">
+  <object id="1" name="spawn" type="player" x="8" y="8">
+   <point/>
+   <properties>
+    <property name="health" type="int" value="3"/>
+    <property name="label" value="start"/>
+   </properties>
+  </object>
+  <object id="2" type="trigger" x="24" y="4" width="20" height="8"/>
+  <object id="3" x="40" y="10">
+   <polygon points="0,0 10,-6 20,8"/>
+  </object>
+ </objectgroup>
+</map>
+''', 'tiled', objects=True, object_cell_size=32)
+
+    assert output[None] == bytes([0] * 8 + [0] * 8)
+
+    objects = output['objects']
+    header = struct.unpack('<4sHHHHHHIII', objects[:28])
+    magic, header_length, object_count, property_count, cell_size, grid_width, grid_height, properties_offset, grid_offset, strings_offset = header
+    assert (magic, header_length, object_count, property_count) == (b'MOBJ', 28, 3, 2)
+    assert (cell_size, grid_width, grid_height) == (32, 2, 1)
+
+    strings = objects[strings_offset:]
+
+    def string(offset):
+        return strings[offset:strings.index(b'\0', offset)].decode('utf-8')
+
+    table = [struct.unpack('<IHHBBxxiiIIHH', objects[28 + i * 32:60 + i * 32]) for i in range(object_count)]
+    assert [(string(t[1]), string(t[2])) for t in table] == [('player', 'spawn'), ('trigger', ''), ('', '')]
+    # Shapes and bounds
+    assert [t[4:9] for t in table] == [(2, 8, 8, 0, 0), (0, 24, 4, 20, 8), (3, 40, 4, 20, 14)]
+    assert [t[9:] for t in table] == [(0, 2), (2, 0), (2, 0)]
+
+    props = [struct.unpack('<HBxI', objects[properties_offset + i * 8:properties_offset + i * 8 + 8]) for i in range(property_count)]
+    assert (string(props[0][0]), props[0][1], props[0][2]) == ('health', 0, 3)
+    assert (string(props[1][0]), props[1][1], string(props[1][2])) == ('label', 3, 'start')
+
+    cells = struct.unpack('<3H', objects[grid_offset:grid_offset + 6])
+    lists = struct.unpack(f'<{cells[-1]}H', objects[grid_offset + 6:grid_offset + 6 + cells[-1] * 2])
+    # The trigger straddles both cells, the polygon is only in the second
+    assert lists[cells[0]:cells[1]] == (0, 1)
+    assert lists[cells[1]:cells[2]] == (1, 2)
+
+
+def test_map_tiled_objects_large_map():
+    from ttblit.asset.builders import map
+
+    # 64000 pixels wide, past the range of 16bit bounds, with an object id past 16bits
+    output = map.map.build('''<?xml version="1.0" encoding="UTF-8"?>
+<map version="1.4" tiledversion="1.4.3" orientation="orthogonal" renderorder="right-down" width="4000" height="1" tilewidth="16" tileheight="16" infinite="0" nextlayerid="3" nextobjectid="2">
+ <layer id="1" name="Tile Layer 1" width="4000" height="1">
+  <data encoding="csv">
+{}
+</data>
+ </layer>
+ <objectgroup id="2" name="Objects">
+  <object id="70000" type="goal" x="63900" y="-8" width="40000" height="16"/>
+ </objectgroup>
+</map>
+'''.format(','.join(['0'] * 4000)), 'tiled', objects=True, object_cell_size=1024)
+
+    objects = output['objects']
+    header = struct.unpack('<4sHHHHHHIII', objects[:28])
+    assert header[4:7] == (1024, 63, 1)
+    grid_offset = header[8]
+
+    assert struct.unpack('<IHHBBxxiiIIHH', objects[28:60])[:9] == (70000, 1, 0, 0, 0, 63900, -8, 40000, 16)
+
+    # The object is clamped into the last cell
+    cells = struct.unpack('<64H', objects[grid_offset:grid_offset + 128])
+    assert cells[62:] == (0, 1)
+
+
+def test_map_tiled_objects_too_many_layers():
+    from ttblit.asset.builders import map
+
+    groups = ''.join(f'<objectgroup id="{i + 2}"><object id="{i + 1}" x="0" y="0"/></objectgroup>' for i in range(257))
+
+    with pytest.raises(ValueError):
+        map.map.build(f'''<?xml version="1.0" encoding="UTF-8"?>
+<map version="1.4" tiledversion="1.4.3" orientation="orthogonal" renderorder="right-down" width="1" height="1" tilewidth="8" tileheight="8" infinite="0" nextlayerid="260" nextobjectid="258">
+ <layer id="1" name="Tile Layer 1" width="1" height="1">
+  <data encoding="csv">
+0
+</data>
+ </layer>
+ {groups}
+</map>
+''', 'tiled', objects=True)
+
+
+def test_map_tiled_external_tileset_unused(tmp_path):
+    from ttblit.asset.builders import map
+
+    # The tileset is missing, but nothing needs it
+    source = '''<?xml version="1.0" encoding="UTF-8"?>
+<map version="1.4" tiledversion="1.4.3" orientation="orthogonal" renderorder="right-down" width="2" height="1" tilewidth="8" tileheight="8" infinite="0" nextlayerid="2" nextobjectid="1">
+ <tileset firstgid="1" source="missing.tsx"/>
+ <layer id="1" name="Tile Layer 1" width="2" height="1">
+  <data encoding="csv">
+1,2
+</data>
+ </layer>
+</map>
+'''
+    (tmp_path / 'level.tmx').write_text(source)
+
+    assert map.map.build(source, 'tiled') == b'\x00\x01\x00\x00'
+    assert map.map.from_file(tmp_path / 'level.tmx', None) == b'\x00\x01\x00\x00'
+
+    # Without the map's path, external tilesets can't be found
+    with pytest.raises(ValueError):
+        map.map.build(source, 'tiled', tile_flags=True)
+
+    with pytest.raises(FileNotFoundError):
+        map.map.from_file(tmp_path / 'level.tmx', None, tile_flags=True)
+
+
+def test_map_tiled_tile_flags(tiled_map_with_tileset):
+    from ttblit.asset.builders import map
+
+    output = map.map.from_file(tiled_map_with_tileset, None, tile_flags=True)
+
+    # material is 3 bits from bit 0, solid is 1 bit from bit 3
+    assert output['tile_flags'] == struct.pack(
+        '<4sHHBBxxIBBHBBH4B',
+        b'MTFL', 24, 4, 1, 2, 28,
+        0, 3, 1, 3, 1, 10,
+        0b0000, 0b1000, 0b0000, 0b1101
+    ) + b'\0material\0solid\0'
+
+
+def test_map_tiled_tile_flags_mixed_types():
+    from ttblit.asset.builders import map
+
+    output = map.map.build('''<?xml version="1.0" encoding="UTF-8"?>
+<map version="1.4" tiledversion="1.4.3" orientation="orthogonal" renderorder="right-down" width="2" height="1" tilewidth="8" tileheight="8" infinite="0" nextlayerid="2" nextobjectid="1">
+ <tileset firstgid="1" name="tiles" tilewidth="8" tileheight="8" tilecount="2" columns="2">
+  <tile id="0">
+   <properties>
+    <property name="a" type="bool" value="true"/>
+    <property name="b" type="bool" value="true"/>
+   </properties>
+  </tile>
+  <tile id="1">
+   <properties>
+    <property name="a" type="int" value="6"/>
+   </properties>
+  </tile>
+ </tileset>
+ <layer id="1" name="Tile Layer 1" width="2" height="1">
+  <data encoding="csv">
+1,2
+</data>
+ </layer>
+</map>
+''', 'tiled', tile_flags=True)
+
+    # a needs 3 bits for 6, so b starts at bit 3 and isn't set on tile 1
+    assert output['tile_flags'][16:24] == struct.pack('<BBHBBH', 0, 3, 1, 3, 1, 3)
+    assert output['tile_flags'][24:26] == bytes([0b1001, 0b0110])
+
+
+def test_map_tiled_tile_flags_extracted(tiled_map_with_tileset):
+    from ttblit.asset.builders import map
+
+    output = map.map.from_file(tiled_map_with_tileset, None, tile_flags=True, tileset=True)
+
+    # Only tiles 1 and 4 are used, and become tiles 0 and 1
+    assert output['tile_flags'][24:26] == bytes([0b0000, 0b1101])
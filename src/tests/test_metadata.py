@@ -88,10 +88,12 @@ def test_metadata_dump(test_resources):
             '--file', str(test_resources / 'doom-fire.blit')
         ])
 
-def test_metadata_dump_images(test_resources):
+def test_metadata_dump_images(test_resources, tmp_path):
     from ttblit import main
 
-    file = test_resources / 'doom-fire.blit'
+    # Images are dumped alongside the file
+    file = tmp_path / 'doom-fire.blit'
+    file.write_bytes((test_resources / 'doom-fire.blit').read_bytes())
 
     with pytest.raises(SystemExit):
         main([
@@ -125,3 +125,170 @@ def test_packer_cli_multiple_outputs(test_resources, output_dir):
 
     assert "asset_image_packed" in hpp
     assert "asset_image_raw" in hpp
+
+
+def test_packer_cli_raw_dtype(test_resources, output_dir):
+    from ttblit import main
+
+    with pytest.raises(SystemExit):
+        main([
+            'pack',
+            '--force',
+            '--config', str(test_resources / 'assets_raw_dtype.yml'),
+            '--output', output_dir
+        ])
+
+    report = open(pathlib.Path(output_dir) / "assets_report.txt", "r").read()
+
+    assert "asset_table_int16: 12" in report
+    assert "asset_table_float: 24" in report
+
+
+def test_packer_cli_placement(test_resources, output_dir):
+    from ttblit import main
+
+    with pytest.raises(SystemExit):
+        main([
+            'pack',
+            '--force',
+            '--config', str(test_resources / 'assets_placement.yml'),
+            '--output', output_dir
+        ])
+
+    cpp = open(pathlib.Path(output_dir) / "assets.cpp", "r").read()
+
+    assert 'alignas(32) __attribute__((section(".data.fast"))) const uint8_t asset_table_fast[]' in cpp
+    assert 'alignas(4) const uint8_t asset_table_slow[]' in cpp
+
+
+def test_packer_cli_jobs(test_resources, tmp_path):
+    from ttblit import main
+
+    for jobs in ('1', '3'):
+        with pytest.raises(SystemExit):
+            main([
+                'pack',
+                '--force',
+                # Build every time, so the process pool is used
+                '--no-cache',
+                '--jobs', jobs,
+                '--config', str(test_resources / 'assets_multi_out.yml'),
+                '--output', str(tmp_path / jobs)
+            ])
+
+    outputs = sorted(p.name for p in (tmp_path / '1').iterdir())
+    assert outputs == sorted(p.name for p in (tmp_path / '3').iterdir())
+    for name in outputs:
+        # The report names the output directory
+        if not name.endswith('_report.txt'):
+            assert (tmp_path / '1' / name).read_bytes() == (tmp_path / '3' / name).read_bytes()
+
+
+def test_packer_cli_depfile(test_resources, tmp_path):
+    from ttblit import main
+
+    for name in ('image.png', 'palette.act'):
+        (tmp_path / 'my assets' / name).parent.mkdir(exist_ok=True)
+        (tmp_path / 'my assets' / name).write_bytes((test_resources / name).read_bytes())
+    (tmp_path / 'my assets' / 'tiles.tsx').write_text('''<?xml version="1.0" encoding="UTF-8"?>
+<tileset version="1.4" tiledversion="1.4.3" name="tiles" tilewidth="8" tileheight="8" tilecount="4" columns="2">
+</tileset>
+''')
+    (tmp_path / 'my assets' / 'level.tmx').write_text('''<?xml version="1.0" encoding="UTF-8"?>
+<map version="1.4" tiledversion="1.4.3" orientation="orthogonal" renderorder="right-down" width="2" height="1" tilewidth="8" tileheight="8" infinite="0" nextlayerid="2" nextobjectid="1">
+ <tileset firstgid="1" source="tiles.tsx"/>
+ <layer id="1" name="Tile Layer 1" width="2" height="1">
+  <data encoding="csv">
+1,2
+</data>
+ </layer>
+</map>
+''')
+    (tmp_path / 'my assets' / 'assets.yml').write_text('''assets.cpp:
+  "*.png":
+    palette: palette.act
+  level.tmx:
+    tile_flags: true
+''')
+
+    with pytest.raises(SystemExit):
+        main([
+            'pack',
+            '--force',
+            '--no-cache',
+            '--config', str(tmp_path / 'my assets' / 'assets.yml'),
+            '--output', str(tmp_path / 'out'),
+            '--depfile', str(tmp_path / 'assets.d')
+        ])
+
+    def escape(path):
+        return path.resolve().as_posix().replace(' ', '\\ ')
+
+    # One file per line, with each line but the last continued
+    lines = [line.rstrip(' \\').strip() for line in (tmp_path / 'assets.d').read_text().splitlines()]
+    assert lines[0] == f"{escape(tmp_path / 'out' / 'assets.hpp')} {escape(tmp_path / 'out' / 'assets.cpp')}:"
+    deps = lines[1:]
+    for name in ('assets.yml', 'image.png', 'palette.act', 'level.tmx', 'tiles.tsx'):
+        assert escape(tmp_path / 'my assets' / name) in deps
+
+
+def test_packer_cli_many_inputs(tmp_path):
+    resource = pytest.importorskip('resource')
+    import subprocess
+    import sys
+
+    # More inputs than open files allowed, so they can't all be held open
+    limit = 128
+    for i in range(300):
+        (tmp_path / f'{i:03d}.bin').write_bytes(bytes([i & 0xff]) * (i + 1))
+    (tmp_path / 'assets.yml').write_text('''assets.bin:
+  "*.bin":
+assets.hpp:
+  "*.bin":
+assets.arc:
+  "*.bin":
+''')
+
+    def set_limit():
+        resource.setrlimit(resource.RLIMIT_NOFILE, (limit, resource.getrlimit(resource.RLIMIT_NOFILE)[1]))
+
+    subprocess.run(
+        [sys.executable, '-m', 'ttblit', 'pack', '--jobs', '1', '--no-cache',
+         '--config', str(tmp_path / 'assets.yml'), '--output', str(tmp_path / 'out')],
+        preexec_fn=set_limit, check=True
+    )
+
+    # Globs match in directory order, so only check every asset was written
+    output = (tmp_path / 'out' / 'assets.bin').read_bytes()
+    assert sorted(output) == sorted(b''.join(bytes([i & 0xff]) * (i + 1) for i in range(300)))
+    assert ', '.join(['0x2b'] * 12) in (tmp_path / 'out' / 'assets.hpp').read_text()
+    assert bytes([0x2b]) * 300 in (tmp_path / 'out' / 'assets.arc').read_bytes()
+
+
+def test_packer_cli_jobs_write_in_parent(test_resources, tmp_path, monkeypatch):
+    import os
+
+    from ttblit import main
+    from ttblit.tool import packer
+
+    # Assets are built in other processes, but written by this one
+    writers = []
+    write_target = packer.write_target
+
+    def recording_write_target(*args):
+        writers.append(os.getpid())
+        return write_target(*args)
+
+    monkeypatch.setattr(packer, 'write_target', recording_write_target)
+
+    with pytest.raises(SystemExit):
+        main([
+            'pack',
+            '--force',
+            '--no-cache',
+            '--jobs', '2',
+            '--config', str(test_resources / 'assets_multi_out.yml'),
+            '--output', str(tmp_path)
+        ])
+
+    assert writers and set(writers) == {os.getpid()}
@@ -0,0 +1,154 @@
+import os
+
+import pytest
+
+
+@pytest.fixture
+def watched(tmp_path, monkeypatch):
+    from ttblit.tool import packer
+
+    built = []
+    written = []
+    build_asset = packer.build_asset
+    write_target = packer.write_target
+
+    def counting_build_asset(input_type, input_file, *args):
+        built.append(input_file.name)
+        return build_asset(input_type, input_file, *args)
+
+    def counting_write_target(writer, path, *args):
+        written.append(path.name)
+        return write_target(writer, path, *args)
+
+    monkeypatch.setattr(packer, 'build_asset', counting_build_asset)
+    monkeypatch.setattr(packer, 'write_target', counting_write_target)
+
+    (tmp_path / 'assets.yml').write_text('''data.hpp:
+  prefix: asset_
+  "*.bin":
+text.hpp:
+  prefix: asset_
+  "*.txt":
+''')
+    (tmp_path / 'a.bin').write_bytes(b'a')
+    (tmp_path / 'b.txt').write_bytes(b'b')
+
+    p = packer.Packer()
+    p.setup(tmp_path / 'assets.yml', tmp_path / 'out', None, False)
+    p.load_targets()
+    p.pack()
+
+    yield p, built, written
+
+    p.executor.shutdown()
+    p.write_executor.shutdown()
+
+
+def touch(path, data):
+    # Make sure the change is visible even with coarse timestamps
+    stat = path.stat()
+    path.write_bytes(data)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_watch_no_changes(watched):
+    p, built, written = watched
+
+    assert sorted(built) == ['a.bin', 'b.txt']
+    assert sorted(written) == ['data.hpp', 'text.hpp']
+
+    assert not p.poll()
+    assert len(built) == 2
+    assert len(written) == 2
+
+
+def test_watch_changed_input(watched, tmp_path):
+    p, built, written = watched
+    built.clear()
+    written.clear()
+
+    touch(tmp_path / 'a.bin', b'c')
+
+    assert p.poll()
+    assert built == ['a.bin']
+    assert written == ['data.hpp']
+    assert '0x63' in (tmp_path / 'out' / 'data.hpp').read_text()
+    assert not p.poll()
+
+
+def test_watch_new_file(watched, tmp_path):
+    p, built, written = watched
+    built.clear()
+    written.clear()
+
+    (tmp_path / 'c.bin').write_bytes(b'c')
+
+    assert p.poll()
+    assert built == ['c.bin']
+    assert written == ['data.hpp']
+    assert 'asset_c_bin' in (tmp_path / 'out' / 'data.hpp').read_text()
+
+
+def test_watch_build_error(watched, tmp_path):
+    p, built, written = watched
+
+    (tmp_path / 'assets.yml').write_text('''data.hpp:
+  "*.missing":
+''')
+
+    # Failures are logged, and the next change is picked up
+    assert p.poll()
+    assert not p.poll()
+
+    (tmp_path / 'assets.yml').write_text('''data.hpp:
+  prefix: asset_
+  "*.bin":
+  "*.txt":
+''')
+
+    assert p.poll()
+    assert 'asset_b_txt' in (tmp_path / 'out' / 'data.hpp').read_text()
+
+
+def test_watch_changed_tileset(tmp_path):
+    from ttblit.tool import packer
+
+    tileset = '''<?xml version="1.0" encoding="UTF-8"?>
+<tileset version="1.4" tiledversion="1.4.3" name="tiles" tilewidth="8" tileheight="8" tilecount="4" columns="2">
+ <tile id="1">
+  <properties>
+   <property name="solid" type="bool" value="{solid}"/>
+  </properties>
+ </tile>
+</tileset>
+'''
+    (tmp_path / 'tiles.tsx').write_text(tileset.format(solid='true'))
+    (tmp_path / 'level.tmx').write_text('''<?xml version="1.0" encoding="UTF-8"?>
+<map version="1.4" tiledversion="1.4.3" orientation="orthogonal" renderorder="right-down" width="2" height="1" tilewidth="8" tileheight="8" infinite="0" nextlayerid="2" nextobjectid="1">
+ <tileset firstgid="1" source="tiles.tsx"/>
+ <layer id="1" name="Tile Layer 1" width="2" height="1">
+  <data encoding="csv">
+1,2
+</data>
+ </layer>
+</map>
+''')
+    (tmp_path / 'assets.yml').write_text('''level.raw:
+  level.tmx:
+    tile_flags: true
+''')
+
+    p = packer.Packer()
+    p.setup(tmp_path / 'assets.yml', tmp_path / 'out', None, False)
+    p.load_targets()
+    p.pack()
+    before = (tmp_path / 'out' / 'level.raw').read_bytes()
+
+    # The map itself is unchanged, but the tile properties it reads are not
+    touch(tmp_path / 'tiles.tsx', tileset.format(solid='false').encode('utf-8'))
+
+    assert p.poll()
+    assert (tmp_path / 'out' / 'level.raw').read_bytes() != before
+
+    p.executor.shutdown()
+    p.write_executor.shutdown()
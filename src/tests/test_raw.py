@@ -1,3 +1,6 @@
+import pytest
+
+
 def test_raw_csv_to_binary():
     from ttblit.asset.builders import raw
 
@@ -6,3 +9,100 @@ def test_raw_csv_to_binary():
 7, 8, 9''', 'csv')
 
     assert output == b'\x01\x02\x03\x04\x05\x06\x07\x08\x09'
+
+
+def test_raw_csv_to_binary_no_trailing_commas():
+    from ttblit.asset.builders import raw
+
+    output = raw.raw.build(b'1,2,3\r\n4,5,6\r\n', 'csv')
+
+    assert output == b'\x01\x02\x03\x04\x05\x06'
+
+
+def test_raw_csv_out_of_range():
+    from ttblit.asset.builders import raw
+
+    with pytest.raises(ValueError):
+        raw.raw.build('1, 2, 256', 'csv')
+
+
+def test_raw_csv_invalid_value():
+    from ttblit.asset.builders import raw
+
+    with pytest.raises(ValueError):
+        raw.raw.build('1, two, 3', 'csv')
+
+    # Values must be whole tokens, not just start with a number
+    with pytest.raises(ValueError):
+        raw.raw.build('1, 2two, 3', 'csv')
+
+    with pytest.raises(ValueError):
+        raw.raw.build('1, 2.5, 3', 'csv')
+
+
+def test_csv_to_list():
+    from ttblit.asset.builders import raw
+
+    assert raw.csv_to_list('1,2,\n3,4,\n', 10).tolist() == [1, 2, 3, 4]
+    assert raw.csv_to_list('ff, 10', 16).tolist() == [255, 16]
+    assert raw.csv_to_list('\n', 10).tolist() == []
+
+
+def test_raw_csv_int16():
+    import struct
+
+    from ttblit.asset.builders import raw
+
+    output = raw.raw.build('-32768, 0, 1000, 32767', 'csv', dtype='int16')
+    assert output == struct.pack('<4h', -32768, 0, 1000, 32767)
+
+    output = raw.raw.build('-32768, 0, 1000, 32767', 'csv', dtype='int16', endian='big')
+    assert output == struct.pack('>4h', -32768, 0, 1000, 32767)
+
+
+def test_raw_csv_float32():
+    import struct
+
+    from ttblit.asset.builders import raw
+
+    output = raw.raw.build('0.0, 0.5,\n-1.25, 3', 'csv', dtype='float32')
+    assert output == struct.pack('<4f', 0.0, 0.5, -1.25, 3.0)
+
+
+def test_raw_csv_uint32_out_of_range():
+    from ttblit.asset.builders import raw
+
+    assert raw.raw.build('4294967295', 'csv', dtype='uint32') == b'\xff\xff\xff\xff'
+
+    with pytest.raises(ValueError):
+        raw.raw.build('4294967296', 'csv', dtype='uint32')
+
+    with pytest.raises(ValueError):
+        raw.raw.build('-1', 'csv', dtype='uint16')
+
+
+def test_raw_csv_invalid_dtype():
+    from ttblit.asset.builders import raw
+
+    with pytest.raises(ValueError):
+        raw.raw.build('1', 'csv', dtype='uint64')
+
+    with pytest.raises(ValueError):
+        raw.raw.build('1', 'csv', dtype='int16', endian='middle')
+
+
+def test_raw_compressed():
+    from ttblit.asset.builders import raw
+    from ttblit.core.compression import LZ
+
+    data = b'level data ' * 100
+    output = raw.raw.build(data, 'binary', compress='lz')
+
+    assert len(output) < len(data)
+    assert LZ.decompress(output) == data
+
+    output = raw.raw.build('1, 1, 1, 1, 1, 1, 1, 1', 'csv', dtype='int16', compress='lz', block_size=4)
+    assert LZ.decompress(output) == b'\x01\x00' * 8
+
+    with pytest.raises(ValueError):
+        raw.raw.build(data, 'binary', compress='zip')
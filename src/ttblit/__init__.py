@@ -1,21 +1,49 @@
 
 __version__ = '0.7.4'
 
+import importlib
 import logging
 
 import click
 
-from .asset.builder import AssetTool
-from .tool.cmake import cmake_cli
-from .tool.dfu import dfu_cli
-from .tool.flasher import flash_cli, install_cli, launch_cli
-from .tool.metadata import metadata_cli
-from .tool.packer import pack_cli
-from .tool.relocs import relocs_cli
-from .tool.setup import setup_cli
 
-
-@click.group()
+class LazyGroup(click.Group):
+    """Group which only imports a command's module when the command is used.
+
+    Most tools pull in slow dependencies, such as PIL or pyserial, which
+    other commands don't need. lazy_commands maps each command name to
+    'module:attribute', with the module relative to this package.
+    """
+
+    def __init__(self, *args, lazy_commands=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lazy_commands = lazy_commands or {}
+
+    def list_commands(self, ctx):
+        return sorted(set(super().list_commands(ctx)) | set(self.lazy_commands))
+
+    def get_command(self, ctx, name):
+        if name in self.lazy_commands and name not in self.commands:
+            module, attribute = self.lazy_commands[name].split(':')
+            self.add_command(getattr(importlib.import_module(module, __name__), attribute), name)
+        return super().get_command(ctx, name)
+
+
+@click.group(cls=LazyGroup, lazy_commands={
+    'cmake': '.tool.cmake:cmake_cli',
+    'dfu': '.tool.dfu:dfu_cli',
+    'flash': '.tool.flasher:flash_cli',
+    'font': '.asset.builders.font:font_cli',
+    'image': '.asset.builders.image:image_cli',
+    'install': '.tool.flasher:install_cli',
+    'launch': '.tool.flasher:launch_cli',
+    'map': '.asset.builders.map:map_cli',
+    'metadata': '.tool.metadata:metadata_cli',
+    'pack': '.tool.packer:pack_cli',
+    'raw': '.asset.builders.raw:raw_cli',
+    'relocs': '.tool.relocs:relocs_cli',
+    'setup': '.tool.setup:setup_cli',
+})
 @click.option('--debug', is_flag=True)
 @click.option('-v', '--verbose', count=True)
 def main(debug, verbose):
@@ -26,20 +54,6 @@ def main(debug, verbose):
     logging.basicConfig(level=log_level, format=log_format)
 
 
-for n, c in AssetTool._commands.items():
-    main.add_command(c)
-
-main.add_command(cmake_cli)
-main.add_command(flash_cli)
-main.add_command(install_cli)
-main.add_command(launch_cli)
-main.add_command(metadata_cli)
-main.add_command(pack_cli)
-main.add_command(relocs_cli)
-main.add_command(setup_cli)
-main.add_command(dfu_cli)
-
-
 @main.command(help='Print version and exit')
 def version():
     print(__version__)
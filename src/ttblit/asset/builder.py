@@ -1,13 +1,15 @@
+import contextlib
 import functools
-import importlib
 import pathlib
-import pkgutil
 import re
+import threading
 
 import click
 
 from . import builders
+from .data import FileData
 from .formatter import AssetFormatter
+from .registry import Registry
 from .writer import AssetWriter
 
 
@@ -38,13 +40,53 @@ def make_symbol_name(base=None, working_path=None, input_file=None, input_type=N
     return name
 
 
+class AssetData(bytes):
+    """Built asset bytes, with metadata describing them, such as image dimensions.
+
+    Formatters can emit the metadata alongside the asset so it doesn't need
+    to be parsed from the asset's header at runtime.
+    """
+
+    def __new__(cls, data, **metadata):
+        self = super().__new__(cls, data)
+        self.metadata = metadata
+        return self
+
+
+_reads = threading.local()
+
+
+def record_read(path):
+    """Note a file read by a builder besides its input, such as an external tileset.
+
+    Caches and dependency files use these to notice when a built asset is out of date.
+    """
+    files = getattr(_reads, 'files', None)
+    if files is not None:
+        files.append(pathlib.Path(path))
+
+
+@contextlib.contextmanager
+def recording_reads():
+    """Collect the files recorded by builders run inside the context."""
+    _reads.files = []
+    try:
+        yield _reads.files
+    finally:
+        _reads.files = None
+
+
 class AssetBuilder:
 
-    _by_name = {}
-    _by_extension = {}
+    _by_name = Registry(builders.__name__, builders.by_name)
+    _by_extension = Registry(builders.__name__, builders.by_extension)
 
-    def __init__(self, typemap):
+    def __init__(self, typemap, wants_path=False, passthrough=False):
         self.typemap = typemap
+        self.wants_path = wants_path
+        # Builders which may return their input unchanged are given FileData
+        # instead of the file's contents, so it's only read when written out
+        self.passthrough = passthrough
 
     def __call__(self, build_func):
         self.name = build_func.__name__
@@ -70,7 +112,10 @@ class AssetBuilder:
             subtype = self.guess_subtype(path)
         elif subtype not in self.typemap.keys():
             raise ValueError(f'Invalid subtype {subtype}, choices {self.typemap.keys()}')
-        return self.build(path.read_bytes(), subtype, **kwargs)
+        if self.wants_path:
+            # Let the builder resolve files referenced by the input relative to it
+            kwargs['path'] = path
+        return self.build(FileData(path) if self.passthrough else path.read_bytes(), subtype, **kwargs)
 
     def guess_subtype(self, path):
         for input_type, extensions in self.typemap.items():
@@ -103,17 +148,12 @@ class AssetTool:
         @click.option('--output_format', type=click.Choice(AssetFormatter.names(), case_sensitive=False), default=None, help='Output file format')
         @click.option('--symbol_name', type=str, default=None, help='Output symbol name')
         @click.option('--force/--keep', default=False, help='Force file overwriting')
+        @click.option('--metadata/--no-metadata', default=False, help='Output constants describing the asset, if the format supports them')
         @functools.wraps(f)
-        def cmd(input_file, input_type, output_file, output_format, symbol_name, force, **kwargs):
+        def cmd(input_file, input_type, output_file, output_format, symbol_name, force, metadata, **kwargs):
             aw = AssetWriter()
             aw.add_asset(symbol_name, f(input_file, input_type, **kwargs))
-            aw.write(output_format, output_file, force, report=False)
+            aw.write(output_format, output_file, force, report=False, metadata=metadata)
 
         self._commands[self.name] = cmd
-
-
-# Load all the implementations dynamically.
-for loader, module_name, is_pkg in pkgutil.walk_packages(builders.__path__, builders.__name__ + '.'):
-    # We don't need to import anything from the modules. We just need to load them.
-    # This will cause the decorators to run, which registers the builders.
-    importlib.import_module(module_name, builders.__name__)
+        return cmd
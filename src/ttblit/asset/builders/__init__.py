@@ -0,0 +1,20 @@
+# Builders are only imported when first used, so the module defining
+# each one, and the extensions it's picked for automatically, are listed
+# here. New builders must be added to both.
+
+by_name = {
+    'font': 'font',
+    'image': 'image',
+    'map': 'map',
+    'raw': 'raw',
+}
+
+by_extension = {
+    '.ttf': 'font',
+    '.png': 'image',
+    '.gif': 'image',
+    '.tmx': 'map',
+    '.bin': 'raw',
+    '.raw': 'raw',
+    '.csv': 'raw',
+}
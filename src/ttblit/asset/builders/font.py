@@ -4,7 +4,7 @@ import struct
 import click
 from PIL import Image
 
-from ..builder import AssetBuilder, AssetTool
+from ..builder import AssetBuilder, AssetData, AssetTool
 
 font_typemap = {
     'image': {
@@ -134,8 +134,44 @@ def process_ft_font(data, num_chars, base_char, height):
     return font_data, font_w, char_width, char_height
 
 
+def trim_glyphs(font_data, num_chars, char_width, char_height):
+    """Strip empty leading and trailing columns from every glyph.
+
+    Returns the number of columns trimmed from the left of each glyph,
+    the byte offset of each glyph into the trimmed data (plus a final
+    end offset) and the trimmed glyph data itself.
+    """
+    column_bytes = (char_height + 7) // 8
+    glyph_bytes = column_bytes * char_width
+
+    x_offsets = []
+    offsets = []
+    glyph_data = []
+
+    for c in range(0, num_chars):
+        glyph = font_data[c * glyph_bytes:(c + 1) * glyph_bytes]
+        columns = [glyph[x * column_bytes:(x + 1) * column_bytes] for x in range(0, char_width)]
+        used = [x for x, column in enumerate(columns) if any(column)]
+
+        offsets.append(len(glyph_data))
+
+        if used:
+            x_offsets.append(used[0])
+            for column in columns[used[0]:used[-1] + 1]:
+                glyph_data += column
+        else:
+            x_offsets.append(0)
+
+    offsets.append(len(glyph_data))
+
+    if offsets[-1] > 0xffff:
+        raise ValueError(f'Font data too large for proportional layout ({offsets[-1]} bytes).')
+
+    return x_offsets, offsets, glyph_data
+
+
 @AssetBuilder(typemap=font_typemap)
-def font(data, subtype, num_chars=96, base_char=ord(' '), height=0, horizontal_spacing=1, vertical_spacing=1, space_width=3):
+def font(data, subtype, num_chars=96, base_char=ord(' '), height=0, horizontal_spacing=1, vertical_spacing=1, space_width=3, proportional=False):
     if subtype == 'image':
         font_data, font_w_data, char_width, char_height = process_image_font(
             data, num_chars, height, horizontal_spacing, space_width
@@ -148,13 +184,34 @@ def font(data, subtype, num_chars=96, base_char=ord(' '), height=0, horizontal_s
         raise TypeError(f'Unknown subtype {subtype} for font.')
 
     head_data = struct.pack('<BBBB', num_chars, char_width, char_height, vertical_spacing)
+    metadata = {
+        'num_chars': num_chars,
+        'char_width': char_width,
+        'char_height': char_height,
+        'spacing': vertical_spacing,
+        'proportional': proportional,
+    }
+
+    if proportional:
+        # Store only the occupied columns of each glyph, with a table of
+        # leading column offsets and a table of glyph data offsets.
+        x_offsets, offsets, font_data = trim_glyphs(font_data, num_chars, char_width, char_height)
+
+        data = bytes('FNTP', encoding='utf-8')
+        data += head_data
+        data += bytes(font_w_data)
+        data += bytes(x_offsets)
+        data += struct.pack(f'<{len(offsets)}H', *offsets)
+        data += bytes(font_data)
+
+        return AssetData(data, **metadata)
 
     data = bytes('FONT', encoding='utf-8')
     data += head_data
     data += bytes(font_w_data)
     data += bytes(font_data)
 
-    return data
+    return AssetData(data, **metadata)
 
 
 @AssetTool(font, 'Convert fonts for 32Blit')
@@ -162,5 +219,6 @@ def font(data, subtype, num_chars=96, base_char=ord(' '), height=0, horizontal_s
 @click.option('--horizontal-spacing', type=int, default=1, help='Additional space between characters for variable-width mode')
 @click.option('--vertical-spacing', type=int, default=1, help='Space between lines')
 @click.option('--space-width', type=int, default=3, help='Width of the space character')
+@click.option('--proportional/--fixed', default=False, help='Store only the occupied columns of each character')
 def font_cli(input_file, input_type, **kwargs):
     return font.from_file(input_file, input_type, **kwargs)
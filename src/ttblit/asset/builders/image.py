@@ -7,7 +7,7 @@ from PIL import Image
 
 from ...core.palette import Colour, Palette
 from ...core.struct import struct_blit_image
-from ..builder import AssetBuilder, AssetTool
+from ..builder import AssetBuilder, AssetData, AssetTool
 
 image_typemap = {
     'image': {
@@ -17,8 +17,7 @@ image_typemap = {
 }
 
 
-@AssetBuilder(typemap=image_typemap)
-def image(data, subtype, palette=None, transparent=None, strict=False, packed=True):
+def image_to_struct(image, palette=None, transparent=None, strict=False, packed=True):
     if palette is None:
         palette = Palette()
     else:
@@ -30,10 +29,8 @@ def image(data, subtype, palette=None, transparent=None, strict=False, packed=Tr
             logging.info(f'Found transparent {transparent} in palette')
         else:
             logging.warning(f'Could not find transparent {transparent} in palette')
-    # Since we already have bytes, we need to pass PIL an io.BytesIO object
-    image = Image.open(io.BytesIO(data)).convert('RGBA')
-    image = palette.quantize_image(image, transparent=transparent, strict=strict)
-    return struct_blit_image.build({
+    image = palette.quantize_image(image.convert('RGBA'), transparent=transparent, strict=strict)
+    data = struct_blit_image.build({
         'type': None if packed else 'RW',  # None means let the compressor decide
         'data': {
             'width': image.size[0],
@@ -42,6 +39,19 @@ def image(data, subtype, palette=None, transparent=None, strict=False, packed=Tr
             'pixels': image.tobytes(),
         },
     })
+    return AssetData(
+        data,
+        width=image.size[0],
+        height=image.size[1],
+        format=data[6:8].decode('ascii'),  # The type the compressor picked
+        palette_size=len(palette),
+    )
+
+
+@AssetBuilder(typemap=image_typemap)
+def image(data, subtype, palette=None, transparent=None, strict=False, packed=True):
+    # Since we already have bytes, we need to pass PIL an io.BytesIO object
+    return image_to_struct(Image.open(io.BytesIO(data)), palette, transparent, strict, packed)
 
 
 @AssetTool(image, 'Convert images/sprites for 32Blit')
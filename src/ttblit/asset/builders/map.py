@@ -1,9 +1,21 @@
+import base64
+import gzip
+import io
 import logging
+import pathlib
 import struct
+import zlib
+from collections import namedtuple
+from xml.etree import ElementTree as ET
 
 import click
+import numpy as np
+from PIL import Image
 
-from ..builder import AssetBuilder, AssetTool
+from ...core.compression import TileRL
+from ...core.palette import Colour
+from ..builder import AssetBuilder, AssetData, AssetTool, record_read
+from .image import image_to_struct
 from .raw import csv_to_list
 
 map_typemap = {
@@ -14,81 +26,701 @@ map_typemap = {
 }
 
 
-def tiled_to_binary(data, empty_tile, output_struct):
-    from xml.etree import ElementTree as ET
-    root = ET.fromstring(data)
-    layers = root.findall('layer')
-    layer_data = []
-    transform_data = []
+def decompress_layer(data, compression):
+    if compression is None:
+        return data
+    elif compression == 'zlib':
+        return zlib.decompress(data)
+    elif compression == 'gzip':
+        return gzip.decompress(data)
+    elif compression == 'zstd':
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError('The zstandard package is required for zstd compressed layers.')
+        return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+    else:
+        raise ValueError(f'Unsupported layer compression {compression}.')
+
+
+def tiles_to_array(element, encoding, compression):
+    """Decode a Tiled <data> or <chunk> element into an array of global tile IDs."""
+    if encoding == 'csv':
+        return csv_to_list(element.text, 10).astype(np.uint32)
+    elif encoding == 'base64':
+        tiles = decompress_layer(base64.b64decode(element.text.strip()), compression)
+        return np.frombuffer(tiles, dtype='<u4')
+    elif encoding is None:
+        # Plain XML, one <tile> element per tile
+        return np.array([int(tile.get('gid', 0)) for tile in element.findall('tile')], dtype=np.uint32)
+    else:
+        raise ValueError(f'Unsupported layer encoding {encoding}.')
+
+
+def layer_to_array(data, width, height):
+    """Decode a Tiled <data> element into a list of (x, y, tiles) pieces.
+
+    Fixed size maps have a single piece covering the whole map, while
+    infinite maps have one piece for each <chunk> in the layer.
+    """
+    encoding = data.get('encoding')
+    compression = data.get('compression')
+    chunks = data.findall('chunk')
+
+    if not chunks:
+        return [(0, 0, tiles_to_array(data, encoding, compression).reshape(height, width))]
+
+    return [(
+        int(chunk.get('x')),
+        int(chunk.get('y')),
+        tiles_to_array(chunk, encoding, compression).reshape(int(chunk.get('height')), int(chunk.get('width')))
+    ) for chunk in chunks]
+
+
+# left and top are the tile coordinates of the map's origin, which is not (0, 0) for infinite maps
+TiledMap = namedtuple('TiledMap', ('width', 'height', 'tile_width', 'tile_height', 'layers', 'tilesets', 'objects', 'left', 'top'))
+
+object_shapes = ('rectangle', 'ellipse', 'point', 'polygon', 'polyline', 'tile', 'text')
+
+property_types = ('int', 'bool', 'float', 'string', 'color', 'file', 'object')
+
+
+def parse_properties(element):
+    """Read the <properties> of an element as a list of (name, type, value) tuples."""
+    properties = element.find('properties')
+    if properties is None:
+        return []
+
+    return [(
+        prop.get('name'),
+        prop.get('type', 'string'),
+        prop.get('value', prop.text or ''),
+    ) for prop in properties.findall('property')]
+
+
+def parse_object(element):
+    """Read the shape, axis aligned bounds and properties of an <object>."""
+    x = float(element.get('x', 0))
+    y = float(element.get('y', 0))
+    w = float(element.get('width', 0))
+    h = float(element.get('height', 0))
+
+    shape = 'rectangle'
+    for child in object_shapes:
+        points = element.find(child)
+        if points is not None:
+            shape = child
+            break
+
+    if shape in ('polygon', 'polyline'):
+        points = [tuple(float(v) for v in point.split(',')) for point in points.get('points').split()]
+        x += min(px for px, py in points)
+        y += min(py for px, py in points)
+        w = max(px for px, py in points) - min(px for px, py in points)
+        h = max(py for px, py in points) - min(py for px, py in points)
+    elif element.get('gid') is not None:
+        # Tile objects are positioned by their bottom left corner
+        shape = 'tile'
+        y -= h
+
+    return {
+        'id': int(element.get('id', 0)),
+        'name': element.get('name', ''),
+        # Tiled 1.9 renamed "type" to "class"
+        'type': element.get('type', element.get('class', '')),
+        'shape': shape,
+        'bounds': (x, y, w, h),
+        'properties': parse_properties(element),
+    }
+
+
+def parse_tileset(element, base_path):
+    """Read the tile size, image and tile properties of a <tileset>, loading it from a .tsx file if it is external."""
+    firstgid = int(element.get('firstgid', 1))
+
+    if element.get('source') is not None:
+        if base_path is None:
+            raise ValueError(f'Unable to find external tileset {element.get("source")} without the path of the map.')
+        source = base_path / element.get('source')
+        record_read(source)
+        element = ET.parse(source).getroot()
+        base_path = source.parent
+
+    image = element.find('image')
+
+    return {
+        'firstgid': firstgid,
+        'name': element.get('name'),
+        'tile_width': int(element.get('tilewidth')),
+        'tile_height': int(element.get('tileheight')),
+        'columns': int(element.get('columns', 0)),
+        'spacing': int(element.get('spacing', 0)),
+        'margin': int(element.get('margin', 0)),
+        'tile_count': int(element.get('tilecount', 0)),
+        'image': None if image is None else base_path / image.get('source'),
+        'transparent': None if image is None else image.get('trans'),
+        'tiles': {int(tile.get('id')): parse_properties(tile) for tile in element.findall('tile')},
+    }
+
+
+def parse_tiled(data, base_path=None, load_tilesets=True):
+    """Stream a .tmx document, returning the map size, tile layers and tilesets.
+
+    Each layer element is decoded and discarded as soon as it has been
+    parsed, so only the decoded tile arrays are held in memory.
+
+    Layers are returned as (height, width) arrays of global tile IDs. The
+    chunks of infinite maps are assembled into arrays covering the bounds
+    of every chunk in the map.
+
+    External tilesets are loaded relative to base_path. Tilesets are only
+    read if load_tilesets is set, otherwise the map has none, so maps don't
+    depend on tileset files unless an option uses them.
+    """
+    if type(data) is str:
+        data = data.encode('utf-8')
+
+    attributes = None
+    layers = []
+    tilesets = []
+    object_groups = []
+    in_tileset = 0
+
+    for event, element in ET.iterparse(io.BytesIO(data), events=('start', 'end')):
+        if event == 'start':
+            if element.tag == 'map' and attributes is None:
+                attributes = dict(element.attrib)
+            elif element.tag == 'tileset':
+                in_tileset += 1
+        elif element.tag == 'objectgroup' and not in_tileset:
+            # Tiles in a tileset can have their own object groups for collision shapes
+            object_groups.append((int(element.get('id', 0)), [parse_object(child) for child in element.findall('object')]))
+            element.clear()
+        elif element.tag == 'layer':
+            width = int(attributes['width'])
+            height = int(attributes['height'])
+            layers.append((int(element.get('id')), layer_to_array(element.find('data'), width, height)))
+            element.clear()
+        elif element.tag == 'tileset':
+            in_tileset -= 1
+            if load_tilesets:
+                tilesets.append(parse_tileset(element, base_path))
+            element.clear()
+
     # Sort layers by ID (since .tmx files can have them in arbitrary orders)
-    layers.sort(key=lambda l: int(l.get('id')))
+    layers.sort(key=lambda layer: layer[0])
+    layers = [pieces for layer_id, pieces in layers]
 
-    use_16bits = False
+    left, top = 0, 0
+    right, bottom = int(attributes['width']), int(attributes['height'])
 
-    for layer_csv in layers:
-        raw_layer = csv_to_list(layer_csv.find('data').text, 10)
-        # Shift 1-indexed tiles to 0-indexed, and remap empty tile (0) to specified index
-        # The highest three bits store the transform
-        layer = [empty_tile if i == 0 else (i & 0x1FFFFFFF) - 1 for i in raw_layer]
+    if attributes.get('infinite') == '1':
+        pieces = [piece for layer in layers for piece in layer]
+        if pieces:
+            left = min(x for x, y, tiles in pieces)
+            top = min(y for x, y, tiles in pieces)
+            right = max(x + tiles.shape[1] for x, y, tiles in pieces)
+            bottom = max(y + tiles.shape[0] for x, y, tiles in pieces)
+        logging.info(f'Infinite map spans {left},{top} to {right},{bottom}')
 
-        # This matches the flags used by the TileMap class, but doesn't match SpriteTransform...
-        layer_transforms = [i >> 29 for i in raw_layer]
+    width = right - left
+    height = bottom - top
 
-        if max(layer) > 255 and not use_16bits:
-            # Let's assume it's got 2-byte tile indices
-            logging.info('Found a tile index > 255, using 16bit tile sizes!')
-            use_16bits = True
+    for i, pieces in enumerate(layers):
+        layer = np.zeros((height, width), dtype=np.uint32)
+        for x, y, tiles in pieces:
+            layer[y - top:y - top + tiles.shape[0], x - left:x - left + tiles.shape[1]] = tiles
+        layers[i] = layer
 
-        # Always build up a 1d array of layer data
-        layer_data += layer
-        transform_data += layer_transforms
+    tilesets.sort(key=lambda tileset: tileset['firstgid'])
 
-    if use_16bits:
-        layer_data = struct.pack(f'<{len(layer_data)}H', *layer_data)
+    tile_width = int(attributes['tilewidth'])
+    tile_height = int(attributes['tileheight'])
+
+    object_groups.sort(key=lambda group: group[0])
+    objects = []
+
+    for layer, (group_id, group) in enumerate(object_groups):
+        for tiled_object in group:
+            # Move objects along with the origin of infinite maps
+            x, y, w, h = tiled_object['bounds']
+            tiled_object['bounds'] = (x - left * tile_width, y - top * tile_height, w, h)
+            tiled_object['layer'] = layer
+            objects.append(tiled_object)
+
+    return TiledMap(width, height, tile_width, tile_height, layers, tilesets, objects, left, top)
+
+
+def split_tiles(raw_data, empty_tile):
+    """Split global tile IDs into tile indices and transform flags."""
+    # Shift 1-indexed tiles to 0-indexed, and remap empty tile (0) to specified index
+    # The highest three bits store the transform
+    tiles = np.where(raw_data == 0, empty_tile, (raw_data & 0x1FFFFFFF) - 1)
+
+    # This matches the flags used by the TileMap class, but doesn't match SpriteTransform...
+    transforms = (raw_data >> 29).astype(np.uint8)
+
+    return tiles, transforms
+
+
+def split_chunks(raw_data, chunk_width, chunk_height):
+    """Split (layers, height, width) tile IDs into (layers, rows, columns, chunk_height, chunk_width) chunks.
+
+    Chunks on the right and bottom edges are padded with empty tiles.
+    """
+    layer_count, height, width = raw_data.shape
+    rows = -(-height // chunk_height)
+    columns = -(-width // chunk_width)
+
+    padded = np.zeros((layer_count, rows * chunk_height, columns * chunk_width), dtype=raw_data.dtype)
+    padded[:, :height, :width] = raw_data
+
+    return padded.reshape(layer_count, rows, chunk_height, columns, chunk_width).swapaxes(2, 3)
+
+
+def tile_format(tiles, transforms):
+    """Return whether tiles need 16bit indices, and whether any are transformed."""
+    use_16bits = bool(tiles.size) and tiles.max() > 255
+    return use_16bits, bool(transforms.any())
+
+
+def pack_transforms(transforms):
+    """Pack transform flags into 3 bits per tile, least significant bits first."""
+    bits = np.unpackbits(transforms.reshape(-1, 1), axis=1, bitorder='little')[:, :3]
+    return np.packbits(bits.ravel(), bitorder='little').tobytes()
+
+
+def encode_tiles(raw_data, empty_tile, use_16bits, have_transforms, compress, packed_transforms=False):
+    """Encode a block of tile IDs as tile indices followed by transforms."""
+    tiles, transforms = split_tiles(raw_data.ravel(), empty_tile)
+    tiles = tiles.astype('<u2' if use_16bits else np.uint8)
+
+    if compress == 'rle':
+        data = TileRL.compress(tiles, tiles.itemsize)
+        if have_transforms:
+            data += TileRL.compress(transforms, 1)
+    else:
+        data = tiles.tobytes()
+        if have_transforms:
+            data += pack_transforms(transforms) if packed_transforms else transforms.tobytes()
+
+    return data
+
+
+def blocks_to_binary(blocks, encode, omit_empty=False):
+    """Pack blocks of tile IDs behind a directory of block offsets.
+
+    Blocks are given as an array with an axis for layers and an axis for
+    the blocks within each layer, and are encoded with encode(layer, block).
+
+    The directory holds a uint32 offset for every block, relative to the
+    end of the directory. If omit_empty is set, blocks with no tiles are
+    left out and have an offset of 0xffffffff.
+    """
+    directory = []
+    block_data = []
+    offset = 0
+
+    for layer, block in ((layer, block) for layer, layer_blocks in enumerate(blocks) for block in layer_blocks):
+        if omit_empty and not block.any():
+            directory.append(0xffffffff)
+            continue
+
+        block = encode(layer, block)
+
+        directory.append(offset)
+        block_data.append(block)
+        offset += len(block)
+
+    return struct.pack(f'<{len(directory)}I', *directory) + b''.join(block_data)
+
+
+def extract_tileset(tiled, palette=None, transparent=None, strict=False, packed=True):
+    """Build a tileset containing only the tiles used by a map.
+
+    Returns the map with its tile IDs remapped to the new tileset, the
+    tileset as a SPRITE asset and the original global IDs of its tiles.
+    """
+    if not tiled.tilesets:
+        raise ValueError('Map has no tilesets to extract tiles from.')
+
+    for tileset in tiled.tilesets:
+        if tileset['image'] is None:
+            raise ValueError(f'Tileset {tileset["name"]} has no image, image collections are not supported.')
+        if (tileset['tile_width'], tileset['tile_height']) != (tiled.tilesets[0]['tile_width'], tiled.tilesets[0]['tile_height']):
+            raise ValueError('All tilesets must have the same tile size to extract tiles.')
+
+    gids = [layer & 0x1FFFFFFF for layer in tiled.layers]
+    used = np.unique(np.concatenate([layer.ravel() for layer in gids] + [np.zeros(1, dtype=np.uint32)]))[1:]
+
+    tile_width = tiled.tilesets[0]['tile_width']
+    tile_height = tiled.tilesets[0]['tile_height']
+    columns = max(1, min(len(used), tiled.tilesets[0]['columns']))
+    rows = -(-len(used) // columns)
+
+    tileset_image = Image.new('RGBA', (columns * tile_width, rows * tile_height))
+    images = {}
+
+    firstgids = [tileset['firstgid'] for tileset in tiled.tilesets]
+    for index, gid in enumerate(used.tolist()):
+        tileset = tiled.tilesets[np.searchsorted(firstgids, gid, side='right') - 1]
+        if tileset['image'] not in images:
+            record_read(tileset['image'])
+            images[tileset['image']] = Image.open(tileset['image']).convert('RGBA')
+
+        tile = gid - tileset['firstgid']
+        x = tileset['margin'] + (tile % tileset['columns']) * (tile_width + tileset['spacing'])
+        y = tileset['margin'] + (tile // tileset['columns']) * (tile_height + tileset['spacing'])
+
+        tileset_image.paste(
+            images[tileset['image']].crop((x, y, x + tile_width, y + tile_height)),
+            ((index % columns) * tile_width, (index // columns) * tile_height)
+        )
+
+    logging.info(f'Extracted {len(used)} tiles from {len(tiled.tilesets)} tileset(s)')
+
+    if transparent is None and tiled.tilesets[0]['transparent'] is not None:
+        transparent = Colour(tiled.tilesets[0]['transparent'])
+
+    # Renumber the used tiles from 1, keeping the transform bits
+    layers = [
+        np.where(layer == 0, 0, (layer & ~np.uint32(0x1FFFFFFF)) | (np.searchsorted(used, gid) + 1).astype(np.uint32))
+        for layer, gid in zip(tiled.layers, gids)
+    ]
+
+    return tiled._replace(layers=layers), image_to_struct(tileset_image, palette, transparent, strict, packed), used
+
+
+def tile_flags_to_binary(tiled, gids=None):
+    """Pack boolean and small integer tile properties into a table of flags per tile index.
+
+    Each property becomes a bit field, allocated in name order from the
+    least significant bit, with enough bits for its largest value on any
+    tile: one bit for booleans, and up to eight for integers in
+    range(0, 256). A property may be boolean on some tiles and an integer
+    on others, booleans count as 0 or 1. If gids is given, the table is
+    built for those global tile IDs instead of every tile.
+    """
+    properties = {}
+
+    for tileset in tiled.tilesets:
+        for tile, tile_properties in tileset['tiles'].items():
+            gid = tileset['firstgid'] + tile
+            for name, prop_type, value in tile_properties:
+                if prop_type == 'bool':
+                    value = 1 if value == 'true' else 0
+                elif prop_type == 'int':
+                    value = int(value)
+                else:
+                    continue
+                properties.setdefault(name, {})[gid] = value
+
+    if gids is None:
+        gids = np.arange(1, max([tileset['firstgid'] + tileset['tile_count'] for tileset in tiled.tilesets] + [1]))
+
+    fields = []
+    shift = 0
+    table = np.zeros(len(gids), dtype=np.uint32)
+
+    for name, values in sorted(properties.items()):
+        if min(values.values()) < 0 or max(values.values()) > 255:
+            logging.warning(f'Skipping tile property {name}, values must be in range(0, 256)')
+            continue
+
+        bits = max(1, max(values.values()).bit_length())
+        column = np.array([values.get(gid, 0) for gid in gids.tolist()], dtype=np.uint32)
+        # Never let a value spill into the next field
+        table |= (column & ((1 << bits) - 1)) << shift
+
+        fields.append((name, shift, bits))
+        shift += bits
+
+    if shift > 32:
+        raise ValueError(f'Tile properties need {shift} bits, more than the 32 available.')
+
+    entry_size = 1 if shift <= 8 else 2 if shift <= 16 else 4
+
+    strings = StringTable()
+    descriptors = b''.join(struct.pack('<BBH', shift, bits, strings.add(name)) for name, shift, bits in fields)
+    table = table.astype(f'<u{entry_size}').tobytes()
+
+    header_length = 16 + len(descriptors)
+
+    return struct.pack(
+        '<4sHHBBxxI',
+        bytes('MTFL', encoding='utf-8'),
+        header_length,
+        len(gids),
+        entry_size,
+        len(fields),
+        header_length + len(table)
+    ) + descriptors + table + bytes(strings.data)
+
+
+class StringTable:
+    """Null terminated strings, stored once each and referenced by offset."""
+
+    def __init__(self):
+        self.data = bytearray(b'\0')
+        self.offsets = {'': 0}
+
+    def add(self, string):
+        if string not in self.offsets:
+            self.offsets[string] = len(self.data)
+            self.data += string.encode('utf-8') + b'\0'
+        if self.offsets[string] > 0xffff:
+            raise ValueError('Too much string data for object output.')
+        return self.offsets[string]
+
+
+def property_value(prop_type, value, strings):
+    """Convert a Tiled property value to its 32bit representation."""
+    if prop_type in ('int', 'object'):
+        return int(value or 0) & 0xffffffff
+    elif prop_type == 'bool':
+        return 1 if value == 'true' else 0
+    elif prop_type == 'float':
+        return struct.unpack('<I', struct.pack('<f', float(value)))[0]
+    elif prop_type == 'color':
+        # Tiled colours are #AARRGGBB, or empty if unset
+        return int(value.lstrip('#') or '0', 16)
     else:
-        layer_data = struct.pack(f'<{len(layer_data)}B', *layer_data)
+        return strings.add(value)
+
+
+def objects_to_binary(tiled, cell_size):
+    """Pack object layers into a MOBJ table with a uniform grid spatial index.
+
+    Objects are stored by their unrotated axis aligned bounds in pixels.
+    Ids and bounds are 32bit, since Tiled's object ids keep growing and
+    large maps can be wider than 32767 pixels.
+    Each grid cell lists every object whose bounds overlap it, so a region
+    query only needs to visit the objects in the cells it covers.
+    """
+    if cell_size <= 0:
+        raise ValueError('Object grid cell size must be positive.')
+
+    strings = StringTable()
+    object_data = []
+    property_data = []
+
+    grid_width = max(1, -(-tiled.width * tiled.tile_width // cell_size))
+    grid_height = max(1, -(-tiled.height * tiled.tile_height // cell_size))
+    cells = [[] for _ in range(grid_width * grid_height)]
+
+    for index, tiled_object in enumerate(tiled.objects):
+        x, y, w, h = (int(round(v)) for v in tiled_object['bounds'])
+
+        if tiled_object['layer'] > 0xff:
+            raise ValueError(f'Too many object layers for object output, object {tiled_object["id"]} is in layer {tiled_object["layer"]}.')
+
+        object_data.append(struct.pack(
+            '<IHHBBxxiiIIHH',
+            tiled_object['id'],
+            strings.add(tiled_object['type']),
+            strings.add(tiled_object['name']),
+            tiled_object['layer'],
+            object_shapes.index(tiled_object['shape']),
+            x, y, w, h,
+            len(property_data),
+            len(tiled_object['properties']),
+        ))
+
+        for name, prop_type, value in tiled_object['properties']:
+            property_data.append(struct.pack(
+                '<HBxI',
+                strings.add(name),
+                property_types.index(prop_type) if prop_type in property_types else property_types.index('string'),
+                property_value(prop_type, value, strings),
+            ))
+
+        # Clamp to the grid, so objects outside the map land in the edge cells
+        left = min(max(x // cell_size, 0), grid_width - 1)
+        top = min(max(y // cell_size, 0), grid_height - 1)
+        right = min(max((x + max(w, 1) - 1) // cell_size, 0), grid_width - 1)
+        bottom = min(max((y + max(h, 1) - 1) // cell_size, 0), grid_height - 1)
+
+        for cell_y in range(top, bottom + 1):
+            for cell_x in range(left, right + 1):
+                cells[cell_y * grid_width + cell_x].append(index)
+
+    if len(object_data) > 0xffff or len(property_data) > 0xffff:
+        raise ValueError('Too many objects or properties for object output.')
+
+    cell_offsets = np.cumsum([0] + [len(cell) for cell in cells])
+    if cell_offsets[-1] > 0xffff:
+        raise ValueError('Too many objects in the grid for object output, try a larger object_cell_size.')
+    grid_data = struct.pack(f'<{len(cell_offsets)}H', *cell_offsets)
+    grid_data += struct.pack(f'<{cell_offsets[-1]}H', *(index for cell in cells for index in cell))
+
+    header_length = 28
+    properties_offset = header_length + len(object_data) * 32
+    grid_offset = properties_offset + len(property_data) * 8
+    strings_offset = grid_offset + len(grid_data)
+
+    return struct.pack(
+        '<4sHHHHHHIII',
+        bytes('MOBJ', encoding='utf-8'),
+        header_length,
+        len(object_data),
+        len(property_data),
+        cell_size,
+        grid_width,
+        grid_height,
+        properties_offset,
+        grid_offset,
+        strings_offset
+    ) + b''.join(object_data) + b''.join(property_data) + grid_data + bytes(strings.data)
+
+
+def tiled_to_binary(tiled, empty_tile, output_struct, chunk_size=0, compress=None, layer_flags=False):
+    width, height, layers = tiled.width, tiled.height, tiled.layers
+
+    raw_data = np.stack(layers) if layers else np.zeros((0, height, width), dtype=np.uint32)
+
+    layer_data, transform_data = split_tiles(raw_data, empty_tile)
+
+    use_16bits, have_transforms = tile_format(layer_data, transform_data)
+
+    if layer_flags:
+        # Pick the index width and transform presence for each layer individually
+        formats = [tile_format(tiles, transforms) for tiles, transforms in zip(layer_data, transform_data)]
+    else:
+        formats = [(use_16bits, have_transforms)] * len(layers)
+
+    if use_16bits:
+        # Let's assume it's got 2-byte tile indices
+        logging.info('Found a tile index > 255, using 16bit tile sizes!')
+
+    if chunk_size and not output_struct:
+        raise ValueError('Chunked map output requires output_struct.')
+
+    if compress not in (None, 'rle'):
+        raise ValueError(f'Unsupported map compression {compress}.')
+
+    if compress and not output_struct:
+        raise ValueError('Compressed map output requires output_struct.')
+
+    if layer_flags and not output_struct:
+        raise ValueError('Per-layer flags require output_struct.')
+
+    def encode(layer, block):
+        return encode_tiles(block, empty_tile, *formats[layer], compress, packed_transforms=layer_flags)
+
+    metadata = {
+        'width': width,
+        'height': height,
+        'layers': len(layers),
+        'tile_width': tiled.tile_width,
+        'tile_height': tiled.tile_height,
+        'tile_bits': 16 if use_16bits else 8,
+        'transforms': bool(have_transforms),
+    }
 
     if output_struct:  # Fancy struct
         layer_count = len(layers)
-        width = int(root.get("width"))
-        height = int(root.get("height"))
 
         flags = 0
-
-        have_transforms = any(v != 0 for v in transform_data)
+        header = b''
 
         if use_16bits:
             flags |= (1 << 0)
 
         if have_transforms:
             flags |= (1 << 1)
+
+        if compress == 'rle':
+            flags |= (1 << 3)
+
+        if chunk_size:
+            flags |= (1 << 2)
+            # The origin lets Tiled chunk coordinates be found in the directory
+            header += struct.pack('<HHii', chunk_size, chunk_size, tiled.left, tiled.top)
+
+        if layer_flags:
+            # One flags byte per layer, padded to a multiple of 4 bytes
+            flags |= (1 << 4)
+            header += bytes(
+                (1 << 0 if layer_16bits else 0) | (1 << 1 if layer_transforms else 0)
+                for layer_16bits, layer_transforms in formats
+            )
+            header += bytes(-len(header) % 4)
+
+        if chunk_size:
+            # Directory of chunks, in layer, row, column order
+            chunks = split_chunks(raw_data, chunk_size, chunk_size)
+            map_data = blocks_to_binary(chunks.reshape(layer_count, -1, chunk_size, chunk_size), encode, omit_empty=True)
+        elif compress:
+            # Index of rows, in layer, row order
+            map_data = blocks_to_binary(raw_data, encode)
+        elif layer_flags:
+            map_data = b''.join(encode(layer, raw_layer) for layer, raw_layer in enumerate(raw_data))
         else:
-            transform_data = []
+            map_data = layer_data.astype('<u2' if use_16bits else np.uint8).tobytes()
+            if have_transforms:
+                map_data += transform_data.tobytes()
 
-        return struct.pack(
+        return AssetData(struct.pack(
             '<4sHHHHHH',
             bytes('MTMX', encoding='utf-8'),
-            16,
+            16 + len(header),
             flags,
             empty_tile,
             width,
             height,
             layer_count
-        ) + layer_data + bytes(transform_data)
+        ) + header + map_data, flags=flags, **metadata)
 
     else:
         # Just return the raw layer data
-        return layer_data + bytes(transform_data)
+        return AssetData(
+            layer_data.astype('<u2' if use_16bits else np.uint8).tobytes() + transform_data.tobytes(), **metadata
+        )
 
 
-@AssetBuilder(typemap=map_typemap)
-def map(data, subtype, empty_tile=0, output_struct=False):
+@AssetBuilder(typemap=map_typemap, wants_path=True)
+def map(data, subtype, empty_tile=0, output_struct=False, chunk_size=0, compress=None, layer_flags=False,
+        tileset=False, palette=None, transparent=None, strict=False, packed=True,
+        objects=False, object_cell_size=64, tile_flags=False, path=None):
     if subtype == 'tiled':
-        return tiled_to_binary(data, empty_tile, output_struct)
+        # Only the tileset and tile_flags options need the tilesets
+        tiled = parse_tiled(data, None if path is None else path.parent, load_tilesets=tileset or tile_flags)
+        assets = {}
+        gids = None
+
+        if tile_flags and not tiled.tilesets:
+            raise ValueError('Map has no tilesets to read tile properties from.')
+
+        if tileset:
+            tiled, assets['tileset'], gids = extract_tileset(tiled, palette, transparent, strict, packed)
+
+        if tile_flags:
+            # Follow the extracted tileset's indices, if there is one
+            assets['tile_flags'] = tile_flags_to_binary(tiled, gids)
+
+        if objects:
+            assets['objects'] = objects_to_binary(tiled, object_cell_size)
+
+        map_data = tiled_to_binary(tiled, empty_tile, output_struct, chunk_size, compress, layer_flags)
+
+        if assets:
+            return {None: map_data, **assets}
+
+        return map_data
 
 
 @AssetTool(map, 'Convert popular tilemap formats for 32Blit')
 @click.option('--empty-tile', type=int, default=0, help='Remap .tmx empty tiles')
 @click.option('--output-struct', type=bool, default=False, help='Output .tmx as struct with level width/height, etc')
+@click.option('--chunk-size', type=int, default=0, help='Split struct output into square chunks of this many tiles')
+@click.option('--compress', type=click.Choice(['rle'], case_sensitive=False), default=None, help='Compress struct output layers')
+@click.option('--layer-flags', type=bool, default=False, help='Pick index width and transform presence per layer in struct output')
+@click.option('--tileset', type=bool, default=False, help='Also output a tileset of only the tiles used by the map')
+@click.option('--palette', type=pathlib.Path, help='Image or palette file of colours to use for the tileset')
+@click.option('--transparent', type=Colour, default=None, help='Transparent colour for the tileset')
+@click.option('--strict/--no-strict', default=False, help='Reject tileset colours not in the palette')
+@click.option('--objects', type=bool, default=False, help='Also output the object layers with a spatial index')
+@click.option('--object-cell-size', type=int, default=64, help='Size in pixels of the object spatial index cells')
+@click.option('--tile-flags', type=bool, default=False, help='Also output a table of boolean and integer tile properties')
 def map_cli(input_file, input_type, **kwargs):
     return map.from_file(input_file, input_type, **kwargs)
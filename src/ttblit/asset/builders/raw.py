@@ -1,4 +1,9 @@
+import click
+import numpy as np
+
+from ...core.compression import LZ
 from ..builder import AssetBuilder, AssetTool
+from ..data import FileData
 
 binary_typemap = {
     'binary': {
@@ -10,36 +15,75 @@ binary_typemap = {
     }
 }
 
+raw_dtypes = ('uint8', 'int8', 'uint16', 'int16', 'uint32', 'int32', 'float32')
 
-def csv_to_list(input_data, base):
-    if type(input_data) == bytes:
-        input_data = input_data.decode('utf-8')
+raw_endians = {'little': '<', 'big': '>'}
 
-    # Strip leading/trailing whitespace
-    input_data = input_data.strip()
 
-    # Replace '1, 2, 3' to '1,2,3', might as well do it here
-    input_data = input_data.replace(' ', '')
+def csv_to_list(input_data, base, dtype=np.int64):
+    if type(input_data) is not str:
+        input_data = str(input_data, 'utf-8')
 
-    # Split out into rows on linebreak
-    input_data = input_data.split('\n')
+    # Commas, spaces and linebreaks all separate values, so normalise
+    # them to whitespace and let numpy convert every value in one pass.
+    # np.fromstring would be quicker, but older numpy stops at the first
+    # bad value instead of raising.
+    tokens = input_data.replace(',', ' ').split()
 
-    # Split every row into columns on the comma
-    input_data = [row.split(',') for row in input_data]
+    if not tokens:
+        return np.zeros(0, dtype=dtype)
 
-    # Flatten our rows/cols 2d array into a 1d array of bytes
-    # Might as well do the int conversion here, to save another loop
-    return [int(col, base) for row in input_data for col in row if col != '']
+    if base == 10:
+        try:
+            return np.array(tokens, dtype=dtype)
+        except ValueError:
+            raise ValueError('Invalid value in CSV data.')
 
+    return np.array([int(col, base) for col in tokens], dtype=dtype)
 
-@AssetBuilder(typemap=binary_typemap)
-def raw(data, subtype):
-    if subtype == 'csv':
-        return bytes(csv_to_list(data, base=10))
-    else:
+
+def pack_values(values, dtype, endian):
+    """Range check values and pack them as an array of dtype with the given byte order."""
+    if dtype not in raw_dtypes:
+        raise ValueError(f'Invalid dtype {dtype}, choices {raw_dtypes}')
+    if endian not in raw_endians:
+        raise ValueError(f'Invalid endian {endian}, choices {tuple(raw_endians)}')
+
+    dtype = np.dtype(dtype)
+    limits = np.finfo(dtype) if dtype.kind == 'f' else np.iinfo(dtype)
+
+    if values.size and (values.min() < limits.min or values.max() > limits.max):
+        raise ValueError(f'CSV values must be between {limits.min} and {limits.max} for {dtype}.')
+
+    return values.astype(dtype.newbyteorder(raw_endians[endian])).tobytes()
+
+
+@AssetBuilder(typemap=binary_typemap, passthrough=True)
+def raw(data, subtype, dtype='uint8', endian='little', compress=None, window_bits=10, block_size=0):
+    if compress not in (None, 'lz'):
+        raise ValueError(f'Unsupported raw compression {compress}.')
+
+    if subtype == 'binary' and compress is None:
         return data
 
+    if type(data) is FileData:
+        data = bytes(data)
+
+    if subtype == 'csv':
+        values = csv_to_list(data, base=10, dtype=np.float64 if dtype.startswith('float') else np.int64)
+        data = pack_values(values, dtype, endian)
+
+    if compress == 'lz':
+        data = LZ.compress(data, window_bits, block_size)
+
+    return data
+
 
 @AssetTool(raw, 'Convert raw/binary or csv data for 32Blit')
-def raw_cli(input_file, input_type):
-    return raw.from_file(input_file, input_type)
+@click.option('--dtype', type=click.Choice(raw_dtypes, case_sensitive=False), default='uint8', help='Type of each csv value')
+@click.option('--endian', type=click.Choice(tuple(raw_endians), case_sensitive=False), default='little', help='Byte order of csv values')
+@click.option('--compress', type=click.Choice(['lz'], case_sensitive=False), default=None, help='Compress the output')
+@click.option('--window-bits', type=click.IntRange(8, 12), default=10, help='Size of the compression window, in bits')
+@click.option('--block-size', type=int, default=0, help='Compress in independent blocks of this many bytes, for random access')
+def raw_cli(input_file, input_type, **kwargs):
+    return raw.from_file(input_file, input_type, **kwargs)
@@ -0,0 +1,126 @@
+import hashlib
+import logging
+import os
+import pathlib
+import pickle
+
+from .. import __version__
+
+
+def file_digest(path):
+    """SHA-256 of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def file_stat(path):
+    """A file's resolved path, size and modification time, which change whenever it's written."""
+    path = pathlib.Path(path).resolve()
+    stat = path.stat()
+    return f'{path}:{stat.st_size}:{stat.st_mtime_ns}'
+
+
+def asset_key(input_type, input_subtype, input_file, options, wants_path=False, by_content=True):
+    """Hash everything which affects building an asset.
+
+    That is the input's contents, the builder and subtype, the options and
+    the tool version. Options naming a file, such as a palette, are hashed
+    by the file's contents. The input's path is only included for builders
+    which use it, as they may read other files relative to it.
+
+    Without by_content, files are identified by path, size and modification
+    time instead of being read, as make does. That's far cheaper for large
+    inputs, but a copied or touched file gets a different key.
+
+    """
+    identify = file_digest if by_content else file_stat
+
+    def normalize(value):
+        if isinstance(value, pathlib.PurePath) and pathlib.Path(value).is_file():
+            return f'file:{identify(value)}'
+        return repr(value)
+
+    parts = [
+        __version__,
+        input_type,
+        input_subtype,
+        identify(input_file),
+        str(pathlib.Path(input_file).resolve()) if wants_path else '',
+        *(f'{key}={normalize(value)}' for key, value in sorted(options.items())),
+    ]
+    return hashlib.sha256('\0'.join(parts).encode('utf-8')).hexdigest()
+
+
+def default_cache_path():
+    return pathlib.Path(os.environ.get('XDG_CACHE_HOME', pathlib.Path.home() / '.cache')) / '32blit-tools'
+
+
+class AssetCache:
+    """On-disk cache of built assets, keyed by asset_key.
+
+    Each entry holds the built asset and the digests of any other files the
+    builder read, which must still match for the entry to be used. Entries
+    are touched when used, and evict removes the least recently used once
+    the cache grows past max_size bytes.
+    """
+
+    def __init__(self, path=None, max_size=256 * 1024 * 1024):
+        self.path = pathlib.Path(path) if path is not None else default_cache_path()
+        self.max_size = max_size
+        self.path.mkdir(parents=True, exist_ok=True)
+
+    def _entry(self, key):
+        return self.path / f'{key}.pickle'
+
+    def get(self, key):
+        """Return (data, reads) for a key, or None if it isn't cached or is out of date."""
+        entry = self._entry(key)
+        try:
+            with open(entry, 'rb') as f:
+                data, reads = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError) as e:
+            logging.warning(f'Ignoring unreadable cache entry {entry}: {e}')
+            return None
+
+        for path, digest in reads:
+            try:
+                if file_digest(path) != digest:
+                    return None
+            except OSError:
+                return None
+
+        os.utime(entry)
+        return data, [path for path, digest in reads]
+
+    def put(self, key, data, reads=()):
+        """Store a built asset, along with the other files its builder read."""
+        entry = self._entry(key)
+        tmppath = entry.with_name(f'.{entry.name}.{os.getpid()}.tmp')
+        with open(tmppath, 'wb') as f:
+            pickle.dump((data, [(path, file_digest(path)) for path in reads]), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmppath, entry)
+
+    def evict(self):
+        """Remove the least recently used entries until the cache fits in max_size."""
+        entries = []
+        for entry in self.path.glob('*.pickle'):
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry))
+
+        total = sum(size for mtime, size, entry in entries)
+        for mtime, size, entry in sorted(entries):
+            if total <= self.max_size:
+                break
+            try:
+                entry.unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
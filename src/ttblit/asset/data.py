@@ -0,0 +1,67 @@
+import contextlib
+import mmap
+import pathlib
+
+
+def map_file(path):
+    """Memory-map a file read-only, returning a memoryview of its contents.
+
+    The mapping holds a file descriptor open until the view is released.
+    """
+    with open(path, 'rb') as f:
+        try:
+            return memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+        except ValueError:
+            # Empty files can't be mapped
+            return memoryview(b'')
+
+
+class FileData:
+    """An input file which its builder passes through unchanged.
+
+    Only the path and size are kept, so a pack with many inputs doesn't
+    hold a file open for each, and it's cheap to send between processes.
+    The writer maps the file only while streaming it to the output, and
+    bytes() reads it for anything that needs it whole.
+    """
+
+    def __init__(self, path):
+        self.path = pathlib.Path(path)
+        self.length = self.path.stat().st_size
+
+    def __len__(self):
+        return self.length
+
+    def __bytes__(self):
+        with mapped(self) as view:
+            return bytes(view)
+
+    def __getitem__(self, index):
+        """Read a slice of the file, such as the magic at the start of an asset."""
+        start, stop, step = index.indices(self.length)
+        with open(self.path, 'rb') as f:
+            f.seek(start)
+            return f.read(max(stop - start, 0))[::step]
+
+    def __repr__(self):
+        return f'FileData({str(self.path)!r})'
+
+    @contextlib.contextmanager
+    def mapped(self):
+        view = map_file(self.path)
+        try:
+            if len(view) != self.length:
+                raise RuntimeError(f'{self.path} changed size while packing.')
+            yield view
+        finally:
+            view.release()
+
+
+@contextlib.contextmanager
+def mapped(data):
+    """Map FileData for the duration of the context. Other data is used as is."""
+    if isinstance(data, FileData):
+        with data.mapped() as view:
+            yield view
+    else:
+        yield data
@@ -1,16 +1,17 @@
-import importlib
-import pkgutil
-
 from . import formatters
+from .registry import Registry
 
 
 class AssetFormatter():
-    _by_name = {}
-    _by_extension = {}
+    _by_name = Registry(formatters.__name__, formatters.by_name)
+    _by_extension = Registry(formatters.__name__, formatters.by_extension)
+    alias = None
 
-    def __init__(self, components=None, extensions=None):
+    def __init__(self, components=None, extensions=None, split=None):
         self.components = components if components else (None, )
         self.extensions = extensions
+        # The component which may be split across several files
+        self.split = split
 
     def __call__(self, fragment_func):
         """Decorator method to create a formatter instance from a fragment function."""
@@ -27,6 +28,28 @@ class AssetFormatter():
             self._by_extension[ext] = self
         return self
 
+    def aliaser(self, alias_func):
+        """Decorator method to attach an alias function, for assets identical to an earlier one."""
+        self.alias = alias_func
+        return self
+
+    def output_paths(self, path, split=1):
+        """Yield (component, shard, path) for each file written for path.
+
+        With split > 1 the split component is written to numbered files,
+        and shard is the index of each, otherwise shard is None.
+
+        """
+        if split > 1 and self.split is None:
+            raise ValueError(f'Formatter {self.name} can not split its output.')
+        for component in self.components:
+            suffix = path.suffix if component is None else f'.{component}'
+            if split > 1 and component == self.split:
+                for shard in range(split):
+                    yield component, shard, path.with_name(f'{path.stem}_{shard}{suffix}')
+            else:
+                yield component, None, path.with_suffix(suffix)
+
     def __repr__(self):
         return self.name
 
@@ -40,7 +63,7 @@ class AssetFormatter():
 
     @classmethod
     def names(cls):
-        return cls._by_name.keys()
+        return cls._by_name.names()
 
     @classmethod
     def parse(cls, value):
@@ -60,10 +83,3 @@ class AssetFormatter():
             return cls._by_extension[path.suffix]
         except KeyError:
             raise TypeError(f"Unable to identify format for {path}.")
-
-
-# Load all the implementations dynamically.
-for loader, module_name, is_pkg in pkgutil.walk_packages(formatters.__path__, formatters.__name__ + '.'):
-    # We don't need to import anything from the modules. We just need to load them.
-    # This will cause the decorators to run, which registers the formatters.
-    importlib.import_module(module_name, formatters.__name__)
@@ -0,0 +1,23 @@
+# Formatters are only imported when first used, so the module defining
+# each one, and the extensions it's picked for, are listed here. New
+# formatters must be added to both.
+
+by_name = {
+    'archive': 'archive',
+    'asm_incbin': 'asm',
+    'c_header': 'c',
+    'c_source': 'c',
+    'raw_binary': 'raw',
+}
+
+by_extension = {
+    '.arc': 'archive',
+    '.S': 'asm',
+    '.s': 'asm',
+    '.hpp': 'c',
+    '.h': 'c',
+    '.cpp': 'c',
+    '.c': 'c',
+    '.raw': 'raw',
+    '.bin': 'raw',
+}
@@ -0,0 +1,19 @@
+from ...core.archive import Archive
+from ..formatter import AssetFormatter
+
+
+@AssetFormatter(extensions=('.arc', ))
+def archive(symbol, data, align=None, section=None, metadata=None):
+    return {None: (symbol, data, align, None)}
+
+
+@archive.joiner
+def archive(path, fragments):
+    # Payloads are streamed to the output after the directory
+    return {None: Archive.build(fragments[None])}
+
+
+@archive.aliaser
+def archive(symbol, target, metadata=None):
+    # The alias gets its own directory entry, sharing the target's payload
+    return {None: (symbol, None, None, target)}
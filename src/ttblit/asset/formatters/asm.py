@@ -0,0 +1,71 @@
+from ..formatter import AssetFormatter
+from .c import c_alias, c_boilerplate, c_declaration
+
+
+def asm_incbin_symbol(symbol, binary, offset, length, align=None, section=None):
+    """Yield assembler defining symbol as a slice of the binary file, plus its length."""
+    if section:
+        yield f'    .pushsection {section}, "a"\n'
+    yield f'    .global {symbol}\n'
+    yield f'    .type {symbol}, %object\n'
+    yield f'    .balign {align or 4}\n'
+    yield f'{symbol}:\n'
+    if length:
+        yield f'    .incbin "{binary}", {offset}, {length}\n'
+    yield f'    .size {symbol}, {length}\n'
+    if section:
+        yield '    .popsection\n'
+    yield '\n'
+    yield f'    .global {symbol}_length\n'
+    yield f'    .type {symbol}_length, %object\n'
+    yield '    .balign 4\n'
+    yield f'{symbol}_length:\n'
+    yield f'    .4byte {length}\n'
+    yield f'    .size {symbol}_length, 4\n'
+
+
+@AssetFormatter(components=(None, 'hpp', 'bin'), extensions=('.S', '.s'))
+def asm_incbin(symbol, data, align=None, section=None, metadata=None):
+    return {
+        None: (symbol, len(data), align, section),
+        'hpp': c_declaration('extern const', symbol, metadata=metadata),
+        'bin': data,
+    }
+
+
+@asm_incbin.joiner
+def asm_incbin(path, fragments):
+    # The assembler resolves .incbin paths against its working directory,
+    # not the source file, so refer to the binary by absolute path.
+    binary = path.with_suffix('.bin').resolve().as_posix()
+
+    def source():
+        yield '/* Auto Generated File - DO NOT EDIT! */\n'
+        yield '    .section .rodata\n'
+        offset = 0
+        for fragment in fragments[None]:
+            if fragment is None:
+                continue
+            symbol, length, align, section = fragment
+            yield '\n'
+            yield from asm_incbin_symbol(symbol, binary, offset, length, align, section)
+            offset += length
+        # Assets are data only, so don't ask the linker for an executable stack
+        yield '\n'
+        yield '    .section .note.GNU-stack,"",%progbits\n'
+
+    return {
+        None: source(),
+        'hpp': c_boilerplate(fragments['hpp'], include='cstdint', header=True),
+        # The writer streams each asset into the binary in turn
+        'bin': fragments['bin'],
+    }
+
+
+@asm_incbin.aliaser
+def asm_incbin(symbol, target, metadata=None):
+    return {
+        None: None,
+        'hpp': c_alias(symbol, target, metadata),
+        'bin': b'',
+    }
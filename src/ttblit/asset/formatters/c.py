@@ -1,46 +1,109 @@
-import textwrap
-
+from ..data import mapped
 from ..formatter import AssetFormatter
 
-wrapper = textwrap.TextWrapper(
-    break_on_hyphens=False, initial_indent='    ', subsequent_indent='    ', width=80
-)
+# The most values textwrap would fit on an 80 column line with a 4 space indent
+values_per_line = 12
+
+# Lines joined into each chunk of output, so large assets are written in big
+# pieces without ever holding the whole initializer as one string
+lines_per_chunk = 1024
+
+# Each byte as it's written in an initializer
+c_hex = [f'0x{i:02x}' for i in range(256)]
+
+
+def c_lines(data):
+    """Yield the indented lines of values for an initializer.
+
+    Matches textwrap's greedy fill: twelve values per line, except that a
+    single trailing value (which has no comma) still fits on the last line.
+
+    """
+    if not data:
+        return
+
+    # Where the last line starts, thirteen values long if one would be left over
+    last = max(len(data) - 1, 0) // values_per_line * values_per_line
+    if len(data) % values_per_line == 1 and last > 0:
+        last -= values_per_line
+
+    for start in range(0, last, values_per_line):
+        yield '    ' + ', '.join(c_hex[b] for b in data[start:start + values_per_line])
+    yield '    ' + ', '.join(c_hex[b] for b in data[last:])
 
 
 def c_initializer(data):
     if type(data) is str:
         data = data.encode('utf-8')
-    values = ', '.join(f'0x{c:02x}' for c in data)
-    return f' = {{\n{wrapper.fill(values)}\n}}'
-
 
-def c_declaration(types, symbol, data=None):
-    return textwrap.dedent(
-        '''\
-        {types} uint8_t {symbol}[]{initializer};
-        {types} uint32_t {symbol}_length{size};
-        '''
-    ).format(
-        types=types,
-        symbol=symbol,
-        initializer=c_initializer(data) if data else '',
-        size=f' = sizeof({symbol})' if data else '',
-    )
+    yield ' = {\n'
+    lines = []
+    # Input passed through by its builder is only mapped while it's formatted
+    with mapped(data) as data:
+        for line in c_lines(data):
+            if len(lines) == lines_per_chunk:
+                yield ',\n'.join(lines) + ',\n'
+                lines = []
+            lines.append(line)
+    # The last value has no trailing comma
+    yield ',\n'.join(lines) + '\n}'
+
+
+def c_declaration(types, symbol, data=None, align=None, section=None, metadata=None):
+    if align:
+        yield f'alignas({align}) '
+    if section:
+        yield f'__attribute__((section("{section}"))) '
+    yield f'{types} uint8_t {symbol}[]'
+    if data:
+        yield from c_initializer(data)
+    yield ';\n'
+    yield f'{types} uint32_t {symbol}_length'
+    if data:
+        yield f' = sizeof({symbol})'
+    yield ';\n'
+    if metadata:
+        yield from c_constants(symbol, metadata)
+
+
+def c_constants(symbol, metadata):
+    """Yield constexpr constants for each item of an asset's metadata."""
+    for key, value in metadata.items():
+        if type(value) is bool:
+            yield f'constexpr bool {symbol}_{key} = {str(value).lower()};\n'
+        elif type(value) is int:
+            yield f'constexpr {"int32_t" if value < 0 else "uint32_t"} {symbol}_{key} = {value};\n'
+        elif type(value) is str:
+            yield f'constexpr char {symbol}_{key}[] = "{value}";\n'
+        else:
+            raise TypeError(f'Unable to output {key} of {symbol} as a constant.')
+
+
+def c_alias(symbol, target, metadata=None):
+    yield f'#define {symbol} {target}\n'
+    yield f'#define {symbol}_length {target}_length\n'
+    for key in metadata or ():
+        yield f'#define {symbol}_{key} {target}_{key}\n'
 
 
 def c_boilerplate(data, include, header=True):
-    lines = ['// Auto Generated File - DO NOT EDIT!']
+    yield '// Auto Generated File - DO NOT EDIT!\n'
     if header:
-        lines.append('#pragma once')
-    lines.append(f'#include <{include}>')
-    lines.append('')
-    lines.extend(data)
-    return '\n'.join(lines)
+        yield '#pragma once\n'
+    yield f'#include <{include}>\n'
+    for fragment in data:
+        if fragment is None:
+            continue
+        yield '\n'
+        if type(fragment) is str:
+            yield fragment
+        else:
+            yield from fragment
 
 
 @AssetFormatter(extensions=('.hpp', '.h'))
-def c_header(symbol, data):
-    return {None: c_declaration('inline const', symbol, data)}
+def c_header(symbol, data, align=None, section=None, metadata=None):
+    return {None: c_declaration('inline const', symbol, data, align, section, metadata)}
 
 
 @c_header.joiner
@@ -48,11 +111,16 @@ def c_header(path, fragments):
     return {None: c_boilerplate(fragments[None], include="cstdint", header=True)}
 
 
-@AssetFormatter(components=('hpp', 'cpp'), extensions=('.cpp', '.c'))
-def c_source(symbol, data):
+@c_header.aliaser
+def c_header(symbol, target, metadata=None):
+    return {None: c_alias(symbol, target, metadata)}
+
+
+@AssetFormatter(components=('hpp', 'cpp'), extensions=('.cpp', '.c'), split='cpp')
+def c_source(symbol, data, align=None, section=None, metadata=None):
     return {
-        'hpp': c_declaration('extern const', symbol),
-        'cpp': c_declaration('const', symbol, data),
+        'hpp': c_declaration('extern const', symbol, metadata=metadata),
+        'cpp': c_declaration('const', symbol, data, align, section),
     }
 
 
@@ -63,3 +131,11 @@ def c_source(path, fragments):
         'hpp': c_boilerplate(fragments['hpp'], include='cstdint', header=True),
         'cpp': c_boilerplate(fragments['cpp'], include=include, header=False),
     }
+
+
+@c_source.aliaser
+def c_source(symbol, target, metadata=None):
+    return {
+        'hpp': c_alias(symbol, target, metadata),
+        'cpp': None,
+    }
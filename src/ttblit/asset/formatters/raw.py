@@ -2,10 +2,21 @@ from ..formatter import AssetFormatter
 
 
 @AssetFormatter(extensions=('.raw', '.bin'))
-def raw_binary(symbol, data):
-    return {None: data}
+def raw_binary(symbol, data, align=None, section=None, metadata=None):
+    return {None: (data, align)}
 
 
 @raw_binary.joiner
 def raw_binary(path, fragments):
-    return {None: b''.join(fragments[None])}
+    def binary():
+        offset = 0
+        for data, align in fragments[None]:
+            # Pad so the asset starts at a multiple of its alignment from the start of the file
+            padding = -offset % align if align else 0
+            if padding:
+                yield bytes(padding)
+            yield data
+            offset += padding + len(data)
+
+    # The writer streams each fragment to the output in turn
+    return {None: binary()}
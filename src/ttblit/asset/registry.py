@@ -0,0 +1,50 @@
+import importlib
+
+
+class Registry(dict):
+    """Implementations by name, importing the module which registers each when it's first looked up.
+
+    Importing every builder and formatter up front pulls in their dependencies,
+    which is slow, so the package lists which module registers each name. The
+    implementations still register themselves when their module is imported.
+
+    Iterating the registry imports every module first, so it's complete.
+    Membership tests do not, and only see what is already registered.
+    """
+
+    def __init__(self, package, modules):
+        super().__init__()
+        self.package = package
+        self.modules = modules
+
+    def __missing__(self, key):
+        try:
+            module = self.modules[key]
+        except (KeyError, TypeError):
+            raise KeyError(key) from None
+        importlib.import_module(f'{self.package}.{module}')
+        return dict.__getitem__(self, key)
+
+    def names(self):
+        """All the names, without importing anything."""
+        return self.modules.keys()
+
+    def load_all(self):
+        for module in sorted(set(self.modules.values())):
+            importlib.import_module(f'{self.package}.{module}')
+
+    def __iter__(self):
+        self.load_all()
+        return super().__iter__()
+
+    def keys(self):
+        self.load_all()
+        return super().keys()
+
+    def values(self):
+        self.load_all()
+        return super().values()
+
+    def items(self):
+        self.load_all()
+        return super().items()
@@ -1,5 +1,9 @@
+import hashlib
+import itertools
 import logging
+import os
 
+from .data import FileData, mapped
 from .formatter import AssetFormatter
 
 
@@ -7,11 +11,22 @@ class AssetWriter:
 
     def __init__(self):
         self._assets = {}
+        self._placement = {}
 
-    def add_asset(self, symbol, data):
+    def add_asset(self, symbol, data, align=None, section=None):
+        """Add an asset, optionally aligned to a power of two or placed in a linker section."""
+        if type(data) is dict:
+            # Builders may produce several assets from one input,
+            # keyed by the suffix to add to the symbol name.
+            for suffix, part in data.items():
+                self.add_asset(symbol if suffix is None else f'{symbol}_{suffix}', part, align, section)
+            return
         if symbol in self._assets:
             raise NameError(f'Symbol {symbol} has already been added.')
+        if align is not None and (type(align) is not int or align < 1 or align & (align - 1)):
+            raise ValueError(f'Alignment {align} of {symbol} is not a power of two.')
         self._assets[symbol] = data
+        self._placement[symbol] = {'align': align, 'section': section}
 
     def _sorted(self, sort):
         if sort is None:
@@ -23,6 +38,41 @@ class AssetWriter:
         else:
             raise ValueError(f"Don't know how to sort by {sort}.")
 
+    def _aliases(self, assets, metadata):
+        """Find assets identical to an earlier one with the same placement. Returns {symbol: earlier symbol}.
+
+        If metadata is output, it must match as well, since an alias shares its target's constants.
+        """
+        # Only assets the same size as another can match, so the rest aren't hashed
+        candidates = {}
+        for symbol, data in assets:
+            info = tuple(sorted(getattr(data, 'metadata', {}).items())) if metadata else ()
+            if type(data) is str:
+                data = data.encode('utf-8')
+            placement = tuple(self._placement[symbol].values())
+            candidates.setdefault((len(data), placement, info), []).append((symbol, data))
+
+        seen = {}
+        aliases = {}
+        for key, group in candidates.items():
+            if len(group) < 2:
+                continue
+            for symbol, data in group:
+                with mapped(data) as view:
+                    digest = hashlib.sha256(view).digest()
+                target = seen.setdefault((digest, key), symbol)
+                if target != symbol:
+                    aliases[symbol] = target
+        # In the order of the assets, for the report
+        return {symbol: aliases[symbol] for symbol, data in assets if symbol in aliases}
+
+    def _fragments(self, fmt, symbol, data, aliases, metadata):
+        # Builders may attach metadata to the assets they return
+        info = getattr(data, 'metadata', None) if metadata else None
+        if symbol in aliases:
+            return fmt.alias(symbol, aliases[symbol], metadata=info)
+        return fmt.fragments(symbol, data, metadata=info, **self._placement[symbol])
+
     def _get_format(self, value, path, default='c_header'):
         if value is None:
             if path is None:
@@ -35,26 +85,108 @@ class AssetWriter:
         else:
             return AssetFormatter.parse(value)
 
-    def write(self, fmt=None, path=None, force=False, report=True, sort=None):
+    @staticmethod
+    def _chunks(data):
+        """Formatters return a string or buffer, or an iterable of them, for each component.
+
+        Buffers may be FileData, which is mapped while it's written.
+        """
+        if isinstance(data, (str, bytes, bytearray, memoryview, FileData)):
+            return [data]
+        return data
+
+    def _write_file(self, outpath, data):
+        """Write the chunks to outpath, leaving the file untouched if the content is the same.
+
+        The output is streamed to a temporary file beside outpath while being
+        compared with the existing file, and only replaces it if they differ.
+        Returns True if the file was written.
+
+        """
+        chunks = iter(self._chunks(data))
+        first = next(chunks, b'')
+        mode, encoding = ('', 'utf8') if type(first) is str else ('b', None)
+
+        try:
+            existing = open(outpath, 'r' + mode, encoding=encoding)
+        except FileNotFoundError:
+            existing = None
+
+        def matches(expected, size):
+            try:
+                return existing.read(size) == expected
+            except UnicodeDecodeError:
+                return False
+
+        tmppath = outpath.with_name(f'.{outpath.name}.tmp')
+        f = open(tmppath, 'w' + mode, encoding=encoding)
+        try:
+            same = existing is not None
+            with f:
+                for chunk in itertools.chain((first, ), chunks):
+                    with mapped(chunk) as chunk:
+                        f.write(chunk)
+                        same = same and matches(chunk, len(chunk))
+                # The existing file must also end here
+                same = same and matches('' if mode == '' else b'', 1)
+        except BaseException:
+            tmppath.unlink()
+            raise
+        finally:
+            if existing is not None:
+                existing.close()
+
+        if same:
+            tmppath.unlink()
+        else:
+            os.replace(tmppath, outpath)
+
+        return not same
+
+    @staticmethod
+    def _shards(assets, split):
+        """Divide assets into split contiguous runs of roughly equal size. Returns the shard of each asset."""
+        total = max(sum(len(data) for symbol, data in assets), 1)
+        shards = []
+        offset = 0
+        for symbol, data in assets:
+            shards.append(min(int((offset + len(data) / 2) * split / total), split - 1))
+            offset += len(data)
+        return shards
+
+    def write(self, fmt=None, path=None, force=False, report=True, sort=None, split=1, metadata=False):
         fmt = self._get_format(fmt, path)
-        assets = self._sorted(sort)
-        fragments = [fmt.fragments(symbol, data) for symbol, data in assets]
+        assets = list(self._sorted(sort))
+        # Formatters which can alias a symbol emit identical assets only once
+        aliases = self._aliases(assets, metadata) if fmt.alias else {}
+        fragments = [self._fragments(fmt, symbol, data, aliases, metadata) for symbol, data in assets]
         components = {key: [f[key] for f in fragments] for key in fragments[0]}
         outpaths = []
 
-        for component, data in fmt.join(path, components).items():
-            if path is None:
-                print(data)
-            else:
-                outpath = path if component is None else path.with_suffix(f'.{component}')
+        if path is None:
+            for component, data in fmt.join(path, components).items():
+                chunks = list(self._chunks(data))
+                print(''.join(chunks) if chunks and type(chunks[0]) is str else b''.join(bytes(chunk) for chunk in chunks))
+        else:
+            joined = fmt.join(path, components)
+            if split > 1:
+                shards = self._shards(assets, split)
+                # Join each shard's fragments separately, keeping only the split component
+                joined_shards = [
+                    fmt.join(path, {
+                        key: [f for f, s in zip(value, shards) if s == shard] for key, value in components.items()
+                    })[fmt.split]
+                    for shard in range(split)
+                ]
+
+            for component, shard, outpath in fmt.output_paths(path, split):
+                data = joined[component] if shard is None else joined_shards[shard]
                 if outpath.exists() and not force:
                     raise FileExistsError(f'Refusing to overwrite {path} (use force)')
+                elif self._write_file(outpath, data):
+                    logging.info(f'Wrote {outpath}')
                 else:
-                    logging.info(f'Writing {outpath}')
-                    if type(data) is str:
-                        outpath.write_text(data, encoding='utf8')
-                    else:
-                        outpath.write_bytes(data)
+                    logging.info(f'Unchanged {outpath}')
                 outpaths.append(outpath)
 
         if path and report:
@@ -63,6 +195,13 @@ class AssetWriter:
                 'Files:', *(f'    {path}' for path in outpaths),
                 'Assets:', *('    {}: {}'.format(symbol, len(data)) for symbol, data in assets),
                 'Total size: {}'.format(sum(len(data) for symbol, data in assets)),
-                '',
             ]
-            path.with_name(path.stem + '_report.txt').write_text('\n'.join(lines))
+            if aliases:
+                lines += [
+                    'Aliases:', *(f'    {symbol}: {target}' for symbol, target in aliases.items()),
+                    'Bytes saved: {}'.format(sum(len(data) for symbol, data in assets if symbol in aliases)),
+                ]
+            lines.append('')
+            self._write_file(path.with_name(path.stem + '_report.txt'), '\n'.join(lines))
+
+        return outpaths
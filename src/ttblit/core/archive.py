@@ -0,0 +1,132 @@
+import bisect
+import mmap
+import re
+import struct
+from collections import namedtuple
+
+ArchiveEntry = namedtuple('ArchiveEntry', ('hash', 'offset', 'length', 'type', 'flags'))
+
+
+class Archive:
+    """Indexed asset archive, for loading assets at runtime from one file.
+
+    The file starts with a header holding the magic, header length,
+    payload alignment and entry count. A directory of entries follows,
+    sorted by the FNV-1a hash of each asset's symbol name so assets can
+    be found by binary search. Each entry holds the hash, the offset
+    and length of the payload from the start of the file, the asset's
+    four character type and flags. Payloads follow, each padded to
+    start on a multiple of the alignment.
+    """
+    header = struct.Struct('<4sHHI')
+    entry = struct.Struct('<III4sI')
+    magic = b'ARCV'
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._data = memoryview(self._mmap)
+
+        magic, header_length, self.align, count = self.header.unpack_from(self._data)
+        if magic != self.magic:
+            self.close()
+            raise ValueError(f'{path} is not an asset archive.')
+
+        self.entries = [
+            ArchiveEntry(*self.entry.unpack_from(self._data, header_length + i * self.entry.size))
+            for i in range(count)
+        ]
+        self._hashes = [entry.hash for entry in self.entries]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, symbol):
+        return self.find(symbol) is not None
+
+    def __getitem__(self, symbol):
+        """Return a view of the payload for a symbol."""
+        entry = self.find(symbol)
+        if entry is None:
+            raise KeyError(symbol)
+        return self._data[entry.offset:entry.offset + entry.length]
+
+    def find(self, symbol):
+        """Return the directory entry for a symbol, or None."""
+        key = self.symbol_hash(symbol)
+        i = bisect.bisect_left(self._hashes, key)
+        if i < len(self._hashes) and self._hashes[i] == key:
+            return self.entries[i]
+        return None
+
+    def close(self):
+        """Unmap the archive. Views returned by lookups must be released first."""
+        self._data.release()
+        self._mmap.close()
+
+    @staticmethod
+    def symbol_hash(symbol):
+        """32bit FNV-1a hash of a symbol name."""
+        value = 0x811c9dc5
+        for c in symbol.encode('utf-8'):
+            value = ((value ^ c) * 0x01000193) & 0xffffffff
+        return value
+
+    @staticmethod
+    def asset_type(data):
+        """The four character magic an asset starts with, if any."""
+        magic = bytes(data[:4])
+        return magic if re.fullmatch(rb'[A-Z0-9]{4}', magic) else bytes(4)
+
+    @staticmethod
+    def build(assets, align=4):
+        """Input: sequence of (symbol, data, align, alias), Output: iterable of archive chunks
+
+        If alias is the name of an earlier symbol, the entry shares its payload and
+        data is ignored. Each payload is aligned to the larger of align and its own
+        alignment, if any.
+
+        """
+        if align < 1:
+            raise ValueError('Archive alignment must be at least 1.')
+
+        def padding(offset, asset_align):
+            return -offset % max(align, asset_align or 1)
+
+        directory = {}
+        for symbol, data, asset_align, alias in assets:
+            key = Archive.symbol_hash(symbol)
+            if key in directory:
+                raise ValueError(f'Symbol {symbol} collides with {directory[key][0]} in the archive directory.')
+            if type(data) is str:
+                data = data.encode('utf-8')
+            directory[key] = (symbol, data, asset_align, alias)
+
+        header_length = Archive.header.size
+        offset = header_length + Archive.entry.size * len(directory)
+        entries = {}
+        payloads = []
+        for symbol, data, asset_align, alias in directory.values():
+            if alias is not None:
+                entries[symbol] = entries[alias]._replace(hash=Archive.symbol_hash(symbol))
+                continue
+            offset += padding(offset, asset_align)
+            entries[symbol] = ArchiveEntry(Archive.symbol_hash(symbol), offset, len(data), Archive.asset_type(data), 0)
+            payloads.append((data, asset_align))
+            offset += len(data)
+
+        yield Archive.header.pack(Archive.magic, header_length, align, len(entries))
+        yield b''.join(Archive.entry.pack(*entry) for entry in sorted(entries.values()))
+
+        offset = header_length + Archive.entry.size * len(entries)
+        for data, asset_align in payloads:
+            pad = padding(offset, asset_align)
+            yield bytes(pad)
+            yield data
+            offset += pad + len(data)
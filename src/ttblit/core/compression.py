@@ -1,5 +1,7 @@
+import struct
 from math import ceil
 
+import numpy as np
 from bitstring import BitArray, Bits, ConstBitStream
 from construct import Adapter
 
@@ -69,6 +71,76 @@ class PK:
 packers = {cls.__name__: cls for cls in (PK, RL)}
 
 
+class TileRL:
+    """Byte aligned run-length encoding of tile indices.
+
+    Each run starts with a control byte. If the top bit is set the next
+    value is repeated (control & 0x7f) + 1 times, otherwise it is followed
+    by control + 1 literal values. Values are little-endian and
+    value_size bytes wide.
+    """
+    @staticmethod
+    def runs(values):
+        """Input: array of values, Output: arrays of run starts and lengths."""
+        boundaries = np.flatnonzero(values[1:] != values[:-1]) + 1
+        starts = np.concatenate(([0], boundaries)) if len(values) else boundaries
+        lengths = np.diff(np.append(starts, len(values)))
+        return starts, lengths
+
+    @staticmethod
+    def compress(values, value_size):
+        """Input: array of values, value size in bytes, Output: RLE'd bytes"""
+        values = np.asarray(values).astype(f'<u{value_size}')
+        result = bytearray()
+        literal_start = literal_count = 0
+
+        def literals(start, count):
+            while count > 0:
+                chunk = min(count, 0x80)
+                result.append(chunk - 1)
+                result.extend(values[start:start + chunk].tobytes())
+                start += chunk
+                count -= chunk
+
+        for start, count in zip(*TileRL.runs(values)):
+            if count == 1:
+                if literal_count == 0:
+                    literal_start = start
+                literal_count += 1
+                continue
+
+            literals(literal_start, literal_count)
+            literal_count = 0
+
+            value = values[start:start + 1].tobytes()
+            while count > 0:
+                chunk = min(count, 0x80)
+                result.append(0x80 | (chunk - 1))
+                result.extend(value)
+                count -= chunk
+
+        literals(literal_start, literal_count)
+
+        return bytes(result)
+
+    @staticmethod
+    def decompress(data, value_size, count, offset=0):
+        """Reference decoder, returns the decoded values and the offset of the end of the run data."""
+        dtype = f'<u{value_size}'
+        result = []
+        while len(result) < count:
+            control = data[offset]
+            length = (control & 0x7f) + 1
+            offset += 1
+            if control & 0x80:
+                result.extend(np.frombuffer(data, dtype, 1, offset).tolist() * length)
+                offset += value_size
+            else:
+                result.extend(np.frombuffer(data, dtype, length, offset).tolist())
+                offset += value_size * length
+        return np.array(result, dtype=dtype), offset
+
+
 class ImageCompressor(Adapter):
 
     def bit_length(self, obj):
@@ -104,3 +176,134 @@ class ImageCompressor(Adapter):
         elif obj['type'] != 'RW':
             obj['data']['pixels'] = packers[obj['type']].compress(obj['data']['pixels'], bl)
         return obj
+
+
+class LZ:
+    """Byte aligned LZSS, for small decoders with little RAM.
+
+    Each group of up to eight tokens is preceded by a flags byte, with one
+    bit per token from the least significant bit. A set bit means a
+    literal byte follows, otherwise a little-endian 16bit match follows,
+    holding (distance - 1) in the top window_bits bits and
+    (length - min_match) in the rest.
+
+    The stream starts with a header describing the window size, the
+    uncompressed length and the block size, followed by an index of
+    block offsets. Blocks are compressed independently so any block
+    can be decoded without decoding the ones before it.
+    """
+    header = struct.Struct('<4sBBxxIII')
+    magic = b'LZSS'
+    min_match = 3
+    max_chain = 16
+
+    @staticmethod
+    def compress_block(data, window_bits):
+        """Input: data bytes, window size in bits, Output: LZSS tokens for the block"""
+        length_bits = 16 - window_bits
+        window = 1 << window_bits
+        max_match = (1 << length_bits) - 1 + LZ.min_match
+        result = bytearray()
+        heads = {}
+        flags_pos = 0
+        flag_bit = 8
+        i = 0
+
+        def remember(position):
+            chain = heads.setdefault(data[position:position + LZ.min_match], [])
+            chain.append(position)
+            if len(chain) > LZ.max_chain * 2:
+                del chain[:-LZ.max_chain]
+
+        while i < len(data):
+            if flag_bit == 8:
+                flags_pos = len(result)
+                result.append(0)
+                flag_bit = 0
+
+            best_length = 0
+            best_distance = 0
+            limit = min(max_match, len(data) - i)
+
+            if limit >= LZ.min_match:
+                for position in reversed(heads.get(data[i:i + LZ.min_match], [])[-LZ.max_chain:]):
+                    distance = i - position
+                    if distance > window:
+                        break
+                    length = LZ.min_match
+                    while length < limit and data[position + length] == data[i + length]:
+                        length += 1
+                    if length > best_length:
+                        best_length, best_distance = length, distance
+                        if length == limit:
+                            break
+
+            if best_length >= LZ.min_match:
+                result.extend(struct.pack('<H', ((best_distance - 1) << length_bits) | (best_length - LZ.min_match)))
+                for position in range(i, i + best_length):
+                    remember(position)
+                i += best_length
+            else:
+                result[flags_pos] |= 1 << flag_bit
+                result.append(data[i])
+                remember(i)
+                i += 1
+
+            flag_bit += 1
+
+        return bytes(result)
+
+    @staticmethod
+    def compress(data, window_bits=10, block_size=0):
+        """Input: data bytes, window size in bits, block size, Output: LZSS stream with header and block index"""
+        if not 8 <= window_bits <= 12:
+            raise ValueError('LZ window_bits must be between 8 and 12.')
+        data = bytes(data)
+        if block_size <= 0:
+            block_size = len(data)
+        blocks = [LZ.compress_block(data[i:i + block_size], window_bits) for i in range(0, len(data), max(block_size, 1))]
+
+        offsets = []
+        offset = 0
+        for block in blocks:
+            offsets.append(offset)
+            offset += len(block)
+
+        return LZ.header.pack(
+            LZ.magic, window_bits, 16 - window_bits, len(data), block_size, len(blocks)
+        ) + struct.pack(f'<{len(offsets)}I', *offsets) + b''.join(blocks)
+
+    @staticmethod
+    def decompress_block(data, block):
+        """Reference decoder for a single block of an LZSS stream."""
+        magic, window_bits, length_bits, length, block_size, block_count = LZ.header.unpack_from(data)
+        if magic != LZ.magic:
+            raise ValueError('Not an LZSS stream.')
+
+        start = LZ.header.size + block_count * 4
+        offset = start + struct.unpack_from('<I', data, LZ.header.size + block * 4)[0]
+        output_length = min(block_size, length - block * block_size)
+
+        result = bytearray()
+        while len(result) < output_length:
+            flags = data[offset]
+            offset += 1
+            for bit in range(8):
+                if len(result) >= output_length:
+                    break
+                if flags & (1 << bit):
+                    result.append(data[offset])
+                    offset += 1
+                else:
+                    token, = struct.unpack_from('<H', data, offset)
+                    offset += 2
+                    distance = (token >> length_bits) + 1
+                    for _ in range((token & ((1 << length_bits) - 1)) + LZ.min_match):
+                        result.append(result[-distance])
+        return bytes(result)
+
+    @staticmethod
+    def decompress(data):
+        """Reference decoder for a whole LZSS stream."""
+        block_count = LZ.header.unpack_from(data)[5]
+        return b''.join(LZ.decompress_block(data, block) for block in range(block_count))
@@ -84,15 +84,13 @@ class CMake(YamlLoader):
                 logging.warning(f'Unable to guess type of {target}, assuming raw/binary')
                 output_formatter = AssetFormatter.parse('raw_binary')
 
-            for suffix in output_formatter.components:
-                if suffix is None:
-                    all_outputs.append(self.destination_path / target.name)
-                else:
-                    all_outputs.append(self.destination_path / target.with_suffix(f'.{suffix}').name)
+            split = options.get('split', 1)
+            for component, shard, path in output_formatter.output_paths(self.destination_path / target.name, split):
+                all_outputs.append(path)
 
             # Strip high-level options from the dict
             # Leaving just file source globs
-            for key in ('prefix', 'type'):
+            for key in ('prefix', 'type', 'split', 'align', 'section', 'metadata'):
                 options.pop(key, None)
 
             for file_glob, file_options in options.items():
@@ -109,7 +107,7 @@ class CMake(YamlLoader):
                 # Parse the options for any references to input files
                 for file_opts in file_options:
                     for key, value in file_opts.items():
-                        if key in ('palette') and type(value) is str:
+                        if key in ('palette', ) and type(value) is str:
                             input_files += list(self.working_path.glob(value))
 
                 # Treat the input string as a glob, and get an input filelist
@@ -120,7 +120,7 @@ class Metadata(YamlLoader):
             __bi_decl(bi_metadata_icon, &((binary_info_raw_data_t *)metadata_icon)->core, ".binary_info.keep.", __used);
             __bi_decl(bi_metadata_splash, &((binary_info_raw_data_t *)metadata_splash)->core, ".binary_info.keep.", __used);
             ''').format(title=title, description=description, version=metadata['version'], url=metadata['url'],
-                        author=author, category=metadata['category'], icon=c_initializer(icon), splash=c_initializer(splash)))
+                        author=author, category=metadata['category'], icon=''.join(c_initializer(icon)), splash=''.join(c_initializer(splash))))
 
         logging.info(f'Wrote pico-sdk binary info to {pico_bi_file}')
 
@@ -1,20 +1,101 @@
 import logging
+import os
 import pathlib
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
 
 import click
 
-from ..asset.builder import AssetBuilder, make_symbol_name
+from ..asset.builder import AssetBuilder, make_symbol_name, recording_reads
+from ..asset.cache import AssetCache, asset_key
+from ..asset.data import FileData
 from ..asset.writer import AssetWriter
 from ..core.yamlloader import YamlLoader
 
 
+def build_asset(input_type, input_file, input_subtype, builder_options):
+    """Build an asset. Returns the asset and the other files the builder read."""
+    with recording_reads() as reads:
+        data = AssetBuilder._by_name[input_type].from_file(input_file, input_subtype, **builder_options)
+    return data, reads
+
+
+def write_target(writer, path, options, force):
+    return writer.write(
+        options.get('type'), path, force=force,
+        split=options.get('split', 1), metadata=options.get('metadata', False)
+    )
+
+
+def depfile_escape(path):
+    """Escape a path for a Make/Ninja depfile."""
+    return path.as_posix().replace('$', '$$').replace('#', '\\#').replace(' ', '\\ ')
+
+
+def write_depfile(path, outputs, inputs):
+    """Write a depfile making each output depend on every input."""
+    lines = [' '.join(depfile_escape(output.resolve()) for output in outputs) + ':']
+    lines += [' ' + depfile_escape(file.resolve()) for file in inputs]
+    path.write_text(' \\\n'.join(lines) + '\n')
+
+
 class Packer(YamlLoader):
 
-    def run(self, config, output, files, force):
+    def run(self, config, output, files, force, jobs=1, cache=None, depfile=None):
+        self.setup(config, output, files, force, jobs, cache, depfile)
+        with self.executor, self.write_executor:
+            self.load_targets()
+            self.pack()
+
+    def watch(self, config, output, files, force, jobs=1, cache=None, interval=1.0, depfile=None):
+        """Pack, then keep packing whenever a watched file changes, until interrupted."""
+        self.setup(config, output, files, force, jobs, cache, depfile)
+        with self.executor, self.write_executor:
+            self.load_targets()
+            self.pack()
+            logging.info('Watching for changes, press Ctrl+C to stop')
+            try:
+                while True:
+                    time.sleep(interval)
+                    self.poll()
+            except KeyboardInterrupt:
+                pass
+
+    def setup(self, config, output, files, force, jobs=1, cache=None, depfile=None):
         if config is None and not files:
             raise click.UsageError('You must supply a config or list of input files.')
+        self.config_file = config
+        self.output = output
+        self.files = files
+        self.force = force
+        self.depfile = pathlib.Path(depfile) if depfile is not None else None
+
+        # Builds are independent, so with more than one job they are spread across
+        # processes. Results are collected in config order so the output doesn't
+        # depend on which finishes first.
+        if jobs > 1:
+            self.executor = ProcessPoolExecutor(jobs)
+        else:
+            self.executor = ThreadPoolExecutor(1)
+
+        # Writing is I/O bound, so targets are written by threads, which
+        # avoids copying every asset to another process
+        self.write_executor = ThreadPoolExecutor(jobs)
+
+        # Builds are shared by key, so an input built the same way twice,
+        # even by different targets, is only built once. They are kept
+        # between packs in watch mode, along with the other files they read.
+        self.cache = cache
+        self.builds = {}
+        self.reads = {}
+        self.written = {}
+        self.outputs = {}
+        self.snapshot = {}
+
+    def load_targets(self):
+        """Read the config and find the input files for each target."""
         self.targets = []
-        self.setup_for_config(config, output, files)
+        self.setup_for_config(self.config_file, self.output, self.files)
 
         # Top level of our config is filegroups and general settings
         for target, options in self.config.items():
@@ -25,7 +106,7 @@ class Packer(YamlLoader):
             target_options = {}
 
             for key, value in options.items():
-                if key in ('prefix', 'type'):
+                if key in ('prefix', 'type', 'split', 'align', 'section', 'metadata'):
                     target_options[key] = value
 
             # Strip high-level options from the dict
@@ -69,17 +150,155 @@ class Packer(YamlLoader):
                 target_options
             ))
 
+    def pack(self):
+        """Build the assets of every target, and write the targets whose assets changed since the last pack."""
         self.destination_path.mkdir(parents=True, exist_ok=True)
+        self.snapshot = self.stat_files()
+        used = set()
 
+        builds = []
         for path, sources, options in self.targets:
+            assets = []
+            for input_files, file_opts in sources:
+                # Placement options apply to the output, so don't pass them to the builder.
+                # Per-file options override the target's.
+                file_opts = dict(file_opts)
+                placement = {key: file_opts.pop(key, options.get(key)) for key in ('align', 'section')}
+                for symbol, key in self.build_assets(input_files, self.working_path, prefix=options.get('prefix'), **file_opts):
+                    assets.append((symbol, key, placement))
+                    used.add(key)
+            builds.append((path, options, assets))
+
+        # Forget builds which are no longer needed
+        for key in set(self.builds) - used:
+            del self.builds[key]
+            self.reads.pop(key, None)
+
+        writes = []
+        for path, options, assets in builds:
+            outpath = self.destination_path / path.name
+            if self.written.get(outpath) == (options, assets):
+                continue
             aw = AssetWriter()
+            for symbol, key, placement in assets:
+                try:
+                    data, reads = self.builds[key].result()
+                except Exception:
+                    # Try again next time
+                    del self.builds[key]
+                    raise
+                # Inputs passed through unchanged are quicker to read again than to cache
+                if self.cache is not None and key not in self.reads and type(data) is not FileData:
+                    self.cache.put(key, data, reads)
+                self.reads[key] = reads
+                aw.add_asset(symbol, data, **placement)
+            # Outputs written by an earlier pack are ours to overwrite
+            writes.append((outpath, options, assets, self.write_executor.submit(
+                write_target, aw, outpath, options, self.force or outpath in self.written
+            )))
+
+        for outpath, options, assets, future in writes:
+            self.outputs[outpath] = future.result()
+            self.written[outpath] = (options, assets)
+
+        # Files are compared with how they were when the pack started, so changes
+        # made while building are noticed. Files read for the first time by this
+        # pack's builds are added, and files no longer used are dropped.
+        self.snapshot = {path: self.snapshot.get(path, stat) for path, stat in self.stat_files().items()}
+
+        if self.cache is not None:
+            self.cache.evict()
+
+        if self.depfile is not None:
+            outputs = [output for path, options, assets in builds for output in self.outputs[self.destination_path / path.name]]
+            # Files which don't exist would stop make, which has no rule to build them
+            write_depfile(self.depfile, outputs, sorted(path for path, stat in self.snapshot.items() if stat is not None))
+
+    def watched_files(self):
+        """The config, input files and files named by options, plus the other files builders read."""
+        files = set()
+        if self.config_file is not None:
+            files.add(self.config_file)
+        for path, sources, options in self.targets:
             for input_files, file_opts in sources:
-                for asset in self.build_assets(input_files, self.working_path, prefix=options.get('prefix'), **file_opts):
-                    aw.add_asset(*asset)
+                files.update(input_files)
+                files.update(self.option_files(file_opts, self.working_path).values())
+        for reads in self.reads.values():
+            files.update(reads)
+        return files
 
-            aw.write(options.get('type'), self.destination_path / path.name, force=force)
+    def stat_files(self):
+        stats = {}
+        for path in self.watched_files():
+            try:
+                stat = path.stat()
+                stats[path] = (stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                stats[path] = None
+        return stats
+
+    def poll(self):
+        """Pack again if any watched file has changed, or new files match the config's globs.
+
+        Only the assets affected by the change are rebuilt, and only the
+        targets containing them are written. Returns True if it packed.
+
+        """
+        try:
+            self.load_targets()
+            error = None
+        except Exception as e:
+            error = e
+
+        snapshot = self.stat_files()
+        if snapshot == self.snapshot:
+            return False
+
+        changed = {path for path in snapshot.keys() | self.snapshot.keys() if snapshot.get(path) != self.snapshot.get(path)}
+        logging.info(f'Changed: {", ".join(sorted(str(path) for path in changed))}')
+        self.snapshot = snapshot
+
+        # Changes to inputs and options change the build keys, but other files
+        # builders read are not part of the key.
+        for key, reads in list(self.reads.items()):
+            if changed.intersection(reads):
+                self.builds.pop(key, None)
+                del self.reads[key]
+                # Targets using the asset must be written again, though its key is the same
+                for outpath, written in self.written.items():
+                    if written is not None and any(key == asset[1] for asset in written[1]):
+                        self.written[outpath] = None
+
+        try:
+            if error is not None:
+                raise error
+            self.pack()
+        except Exception as e:
+            # Keep watching, the next save may fix it
+            logging.error(f'Packing failed: {e}')
+        return True
+
+    @staticmethod
+    def option_files(file_opts, working_path):
+        """Files named by builder options, relative to the working path."""
+        files = {}
+        # Currently the only option we need to do this on is 'palette' for images.
+        for option in ['palette']:
+            try:
+                if not pathlib.Path(file_opts[option]).is_absolute():
+                    files[option] = working_path / file_opts[option]
+                else:
+                    files[option] = pathlib.Path(file_opts[option])
+            except KeyError:
+                pass
+        return files
 
     def build_assets(self, input_files, working_path, name=None, type=None, prefix=None, **builder_options):
+        """Start building each input file, unless it's cached. Yields (symbol name, build key).
+
+        The build's future is self.builds[key], giving the built asset and the other files read.
+
+        """
         if type is None:
             # Glob files all have the same suffix, so we only care about the first one
             try:
@@ -91,18 +310,12 @@ class Packer(YamlLoader):
             typestr = type
 
         input_type, input_subtype = typestr.split('/')
-        builder = AssetBuilder._by_name[input_type]
 
         # Now we know our target builder, one last iteration through the options
         # allows some pre-processing stages to remap paths or other idiosyncrasies
         # of the yml config format.
-        # Currently the only option we need to do this on is 'palette' for images.
-        for option in ['palette']:
-            try:
-                if not pathlib.Path(builder_options[option]).is_absolute():
-                    builder_options[option] = working_path / builder_options[option]
-            except KeyError:
-                pass
+        builder_options.update(self.option_files(builder_options, working_path))
+        builder = AssetBuilder._by_name[input_type]
 
         for file in input_files:
             symbol_name = make_symbol_name(
@@ -110,7 +323,22 @@ class Packer(YamlLoader):
                 input_type=input_type, input_subtype=input_subtype, prefix=prefix
             )
 
-            yield symbol_name, builder.from_file(file, input_subtype, **builder_options)
+            # Without the cache, keys only need to tell builds apart within this run,
+            # or across packs when watching. Inputs a builder may pass through
+            # unchanged can be large, and are usually just copied to the output.
+            by_content = self.cache is not None and not builder.passthrough
+            key = asset_key(input_type, input_subtype, file, builder_options, builder.wants_path, by_content)
+            if key not in self.builds:
+                cached = self.cache.get(key) if self.cache is not None else None
+                if cached is not None:
+                    self.builds[key] = Future()
+                    self.builds[key].set_result(cached)
+                    self.reads[key] = cached[1]
+                    logging.info(f'Using cached build of {file}')
+                else:
+                    self.builds[key] = self.executor.submit(build_asset, input_type, file, input_subtype, builder_options)
+
+            yield symbol_name, key
             logging.info(f' - {typestr} {file} -> {symbol_name}')
 
 
@@ -119,5 +347,16 @@ class Packer(YamlLoader):
 @click.option('--output', type=pathlib.Path, help='Name for output file(s) or root path when using --config')
 @click.option('--files', multiple=True, type=pathlib.Path, help='Input files')
 @click.option('--force', is_flag='store_true', help='Force file overwrite')
-def pack_cli(config, output, files, force):
-    Packer().run(config, output, files, force)
+@click.option('--jobs', '-j', type=click.IntRange(min=1), default=os.cpu_count() or 1, show_default=True, help='Number of assets to build at once')
+@click.option('--cache-dir', type=pathlib.Path, default=None, help='Directory to cache built assets in, ~/.cache/32blit-tools by default')
+@click.option('--cache-size', type=click.IntRange(min=0), default=256, show_default=True, help='Maximum size of the cache in MiB')
+@click.option('--cache/--no-cache', default=True, help='Reuse assets built by earlier runs')
+@click.option('--watch', is_flag=True, help='Keep packing whenever an input changes')
+@click.option('--interval', type=float, default=1.0, show_default=True, help='Seconds between checks for changes when watching')
+@click.option('--depfile', type=pathlib.Path, help='Write a Make/Ninja depfile listing every file read')
+def pack_cli(config, output, files, force, jobs, cache_dir, cache_size, cache, watch, interval, depfile):
+    cache = AssetCache(cache_dir, cache_size * 1024 * 1024) if cache else None
+    if watch:
+        Packer().watch(config, output, files, force, jobs, cache, interval, depfile)
+    else:
+        Packer().run(config, output, files, force, jobs, cache, depfile)